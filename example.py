@@ -6,7 +6,7 @@ import asyncio
 import framebuf
 import logging
 from microui import *
-from microui.hardware import setup_hardware, DisplayManager, ui_task
+from microui.hardware import setup_hardware, DisplayManager
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -113,12 +113,8 @@ async def main():
     display = MockDisplay()
     display_mgr = DisplayManager(display, fb, fps=30)
     
-    # Create tasks
-    ui_coroutine = ui_task(ctx, display_mgr, update_ui)
-    display_coroutine = display_mgr.run_async(ctx)
-    
-    # Run tasks
-    await asyncio.gather(ui_coroutine, display_coroutine)
+    # Build, render and send frames in one task
+    await display_mgr.run_frame_loop(ctx, update_ui)
 
 
 # Hardware example
@@ -131,7 +127,7 @@ def hardware_example():
     - SPI Display: SCK=18, MOSI=23, DC=2, CS=15, RST=4
     """
     import asyncio
-    from microui.hardware import setup_hardware, DisplayManager, ui_task
+    from microui.hardware import setup_hardware, DisplayManager
     
     # Setup hardware
     i2c_params = {'scl': 22, 'sda': 21, 'freq': 400000}
@@ -151,9 +147,8 @@ def hardware_example():
     # Create tasks
     async def run_all():
         await asyncio.gather(
-            touch.poll_async(ctx, interval_ms=50),
-            display_mgr.run_async(ctx),
-            ui_task(ctx, display_mgr, update_ui)
+            touch.poll_async(ctx),
+            display_mgr.run_frame_loop(ctx, update_ui)
         )
     
     # Run
@@ -6,6 +6,11 @@ class FrameBuffer:
         self.RGB565 = 1
         self.operations = []
     
+    def fill(self, color):
+        # A fill covers everything drawn so far: start a fresh record
+        self.operations.clear()
+        self.operations.append(('fill', color))
+    
     def fill_rect(self, x, y, w, h, color):
         self.operations.append(('fill_rect', x, y, w, h, color))
     
@@ -19,4 +24,10 @@ class FrameBuffer:
         self.operations.append(('line', x1, y1, x2, y2, color))
     
     def pixel(self, x, y, color):
-        self.operations.append(('pixel', x, y, color))
\ No newline at end of file
+        self.operations.append(('pixel', x, y, color))
+    
+    def ellipse(self, x, y, xr, yr, color, f=False, m=0x0F):
+        self.operations.append(('ellipse', x, y, xr, yr, color, f, m))
+    
+    def poly(self, x, y, coords, color, f=False):
+        self.operations.append(('poly', x, y, list(coords), color, f))
@@ -32,7 +32,7 @@ __all__ = [
     'MU_KEY_SHIFT', 'MU_KEY_CTRL', 'MU_KEY_ALT', 'MU_KEY_BACKSPACE', 'MU_KEY_RETURN',
     
     # Context functions
-    'begin', 'end', 'set_focus', 'get_id', 'push_id', 'pop_id',
+    'begin', 'end', 'set_focus', 'get_id', 'get_id_uncached', 'push_id', 'pop_id',
     'push_clip_rect', 'pop_clip_rect', 'get_clip_rect',
     'get_current_container', 'get_container', 'bring_to_front',
     'input_mousemove', 'input_mousedown', 'input_mouseup',
@@ -41,6 +41,7 @@ __all__ = [
     # Drawing functions
     'push_command', 'set_clip', 'draw_rect', 'draw_box',
     'draw_text', 'draw_icon', 'draw_frame', 'render_commands',
+    'get_text_width',
     
     # Layout functions
     'layout_row', 'layout_width', 'layout_height',
@@ -0,0 +1,99 @@
+"""
+Native code kernels for microui
+Compiled with the MicroPython viper emitter; core.py falls back to the
+pure Python versions when this module can't be built (CPython, or ports
+without native code support)
+"""
+import micropython
+
+
+@micropython.viper
+def check_clip_rects(r, cr) -> int:
+    """Check rect r against clip rect cr (integer coordinates only)"""
+    rx = int(r.x)
+    ry = int(r.y)
+    rw = int(r.w)
+    rh = int(r.h)
+    cx = int(cr.x)
+    cy = int(cr.y)
+    cw = int(cr.w)
+    ch = int(cr.h)
+    if rx > cx + cw or rx + rw < cx or ry > cy + ch or ry + rh < cy:
+        return 2  # MU_CLIP_ALL
+    if rx >= cx and rx + rw <= cx + cw and ry >= cy and ry + rh <= cy + ch:
+        return 0
+    return 1  # MU_CLIP_PART
+
+
+@micropython.viper
+def clip_rect_into(dst: ptr32, cr) -> int:
+    """Clip the [x, y, w, h] ints in dst to cr in place, 0 if nothing is left"""
+    cx = int(cr.x)
+    cy = int(cr.y)
+    x2 = dst[0] + dst[2]
+    y2 = dst[1] + dst[3]
+    if x2 > cx + int(cr.w):
+        x2 = cx + int(cr.w)
+    if y2 > cy + int(cr.h):
+        y2 = cy + int(cr.h)
+    if dst[0] < cx:
+        dst[0] = cx
+    if dst[1] < cy:
+        dst[1] = cy
+    dst[2] = x2 - dst[0]
+    dst[3] = y2 - dst[1]
+    if dst[2] > 0 and dst[3] > 0:
+        return 1
+    return 0
+
+
+@micropython.viper
+def fnv1a(hash_val: uint, data: ptr8, n: int) -> uint:
+    """32-bit FNV-1a over the first n bytes of data"""
+    i = 0
+    while i < n:
+        hash_val = ((hash_val ^ uint(data[i])) * uint(16777619)) & uint(0xFFFFFFFF)
+        i += 1
+    return hash_val
+
+
+@micropython.viper
+def fnv1a_u32(hash_val: uint, data: uint) -> uint:
+    """32-bit FNV-1a over the 4 little-endian bytes of data"""
+    m = uint(0xFFFFFFFF)
+    hash_val = ((hash_val ^ (data & 0xFF)) * uint(16777619)) & m
+    hash_val = ((hash_val ^ ((data >> 8) & 0xFF)) * uint(16777619)) & m
+    hash_val = ((hash_val ^ ((data >> 16) & 0xFF)) * uint(16777619)) & m
+    hash_val = ((hash_val ^ (data >> 24)) * uint(16777619)) & m
+    return hash_val
+
+
+@micropython.viper
+def pack_rgb565(r: int, g: int, b: int) -> int:
+    """Pack RGB888 to byte-swapped RGB565 (SPI LCD order)"""
+    x = ((r & 0xF8) << 8) | ((g & 0xFC) << 3) | ((b & 0xFF) >> 3)
+    return ((x & 0xFF) << 8) | ((x >> 8) & 0xFF)
+
+
+@micropython.viper
+def parse_ft6236(data: ptr8, out: ptr32, max_points: int) -> int:
+    """Decode FT6236 registers from 0x02 (count byte first) into out as
+    [x, y, pressed, ...], zeroing unused slots; returns the number of
+    points"""
+    n = data[0] & 0x0F
+    if n > max_points:
+        n = max_points
+    i = 0
+    while i < n:
+        o = 1 + i * 6
+        j = i * 3
+        out[j] = ((data[o] & 0x0F) << 8) | data[o + 1]
+        out[j + 1] = ((data[o + 2] & 0x0F) << 8) | data[o + 3]
+        # Event 0 (down) or 2 (contact) have bit 6 clear
+        out[j + 2] = ((data[o] >> 6) & 1) ^ 1
+        i += 1
+    j = n * 3
+    while j < max_points * 3:
+        out[j] = 0
+        j += 1
+    return n
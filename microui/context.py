@@ -15,7 +15,13 @@ def begin(ctx):
     if not ctx.text_width or not ctx.text_height:
         raise RuntimeError("text_width and text_height callbacks must be set")
     
-    ctx.command_list.clear()
+    del ctx.command_list[:]  # keeps capacity on MicroPython, unlike clear()
+    ctx.text_width_cache.clear()
+    ctx.rect_cmd_idx = 0
+    ctx.text_cmd_idx = 0
+    ctx.icon_cmd_idx = 0
+    ctx.clip_cmd_idx = 0
+    ctx.box_cmd_idx = 0
     ctx.root_list.clear()
     ctx.scroll_target = None
     ctx.hover_root = ctx.next_hover_root
@@ -23,9 +29,10 @@ def begin(ctx):
     ctx.mouse_delta.x = ctx.mouse_pos.x - ctx.last_mouse_pos.x
     ctx.mouse_delta.y = ctx.mouse_pos.y - ctx.last_mouse_pos.y
     ctx.frame += 1
+    ctx.refresh_style()
     
     # Initialize clip stack with unclipped rect
-    ctx.clip_stack.push(ctx.unclipped_rect)
+    ctx.clip_stack.append(ctx.unclipped_rect)
 
 
 def end(ctx):
@@ -35,11 +42,11 @@ def end(ctx):
     # Check stacks are empty (clip stack should have 1 item - the base unclipped_rect)
     if ctx.container_stack.idx != 0:
         logger.error("Container stack not empty at end of frame")
-    if ctx.clip_stack.idx != 1:
+    if len(ctx.clip_stack) != 1:
         logger.error("Clip stack not properly balanced at end of frame")
-    if ctx.id_stack.idx != 0:
+    if ctx.id_stack:
         logger.error("ID stack not empty at end of frame")
-    if ctx.layout_stack.idx != 0:
+    if ctx.layout_stack:
         logger.error("Layout stack not empty at end of frame")
     
     # Handle scroll input
@@ -59,7 +66,7 @@ def end(ctx):
         bring_to_front(ctx, ctx.next_hover_root)
     
     # Pop base clip rect
-    if ctx.clip_stack.idx > 0:
+    if ctx.clip_stack:
         ctx.clip_stack.pop()
     
     # Reset input state
@@ -93,6 +100,33 @@ def end(ctx):
         
         if i == n - 1 and cnt.tail:
             cnt.tail.dst = None
+    
+    _merge_rect_commands(ctx)
+
+
+def _merge_rect_commands(ctx):
+    """Fuse consecutive same-colored rects that share an edge into one fill"""
+    prev = None
+    for cmd in ctx.command_list:
+        if cmd.type != MU_COMMAND_RECT:
+            prev = None
+            continue
+        # Compare full RGBA: renderers other than the framebuffer one use
+        # cmd.color, which RGB565 doesn't capture
+        if prev is not None and (prev.color is cmd.color or (
+                prev.color._rgb == cmd.color._rgb and
+                prev.color.a == cmd.color.a)):
+            if (prev.y == cmd.y and prev.h == cmd.h and
+                prev.x + prev.w == cmd.x):
+                prev.w += cmd.w
+                cmd.type = MU_COMMAND_NONE
+                continue
+            if (prev.x == cmd.x and prev.w == cmd.w and
+                prev.y + prev.h == cmd.y):
+                prev.h += cmd.h
+                cmd.type = MU_COMMAND_NONE
+                continue
+        prev = cmd
 
 
 def set_focus(ctx, id_val):
@@ -103,17 +137,48 @@ def set_focus(ctx, id_val):
 
 
 def get_id(ctx, data):
-    """Get ID from data"""
-    idx = ctx.id_stack.idx
-    res = ctx.id_stack.items[idx - 1] if idx > 0 else HASH_INITIAL
-    res = hash_data(res, data)
+    """Get ID from data
+    
+    Ids of strings are cached by object identity, so a literal title or
+    label hashed under the same parent every frame is a dict lookup.
+    """
+    id_stack = ctx.id_stack
+    parent = id_stack[-1] if id_stack else HASH_INITIAL
+    if type(data) is str:
+        cache = ctx._id_cache
+        key = id(data) ^ parent
+        entry = cache.get(key)
+        if entry is not None and entry[0] is data and entry[1] == parent:
+            res = entry[2]
+        else:
+            res = hash_data(parent, data)
+            if len(cache) >= MU_IDCACHE_SIZE:
+                cache.clear()
+            cache[key] = (data, parent, res)
+    else:
+        res = hash_data(parent, data)
+    ctx.last_id = res
+    return res
+
+
+def get_id_uncached(ctx, data):
+    """Get ID from data without touching the string id cache
+    
+    For keys built fresh every frame (str(id(value)) and the like), which
+    would never hit the cache and only push useful entries out of it.
+    """
+    id_stack = ctx.id_stack
+    res = hash_data(id_stack[-1] if id_stack else HASH_INITIAL, data)
     ctx.last_id = res
     return res
 
 
 def push_id(ctx, data):
     """Push ID onto stack"""
-    ctx.id_stack.push(get_id(ctx, data))
+    id_stack = ctx.id_stack
+    if len(id_stack) >= MU_IDSTACK_SIZE:
+        raise RuntimeError(f"Stack overflow (max: {MU_IDSTACK_SIZE})")
+    id_stack.append(get_id(ctx, data))
 
 
 def pop_id(ctx):
@@ -123,8 +188,16 @@ def pop_id(ctx):
 
 def push_clip_rect(ctx, rect):
     """Push clip rectangle"""
-    last = get_clip_rect(ctx)
-    ctx.clip_stack.push(intersect_rects(rect, last))
+    clip_stack = ctx.clip_stack
+    if len(clip_stack) >= MU_CLIPSTACK_SIZE:
+        raise RuntimeError(f"Stack overflow (max: {MU_CLIPSTACK_SIZE})")
+    r = intersect_rects(rect, clip_stack[-1])
+    # Keep clip rects integral: the viper clipper reads them as machine ints
+    r.x = int(r.x)
+    r.y = int(r.y)
+    r.w = int(r.w)
+    r.h = int(r.h)
+    clip_stack.append(r)
 
 
 def pop_clip_rect(ctx):
@@ -134,21 +207,14 @@ def pop_clip_rect(ctx):
 
 def get_clip_rect(ctx):
     """Get current clip rectangle"""
-    if ctx.clip_stack.idx <= 0:
+    if not ctx.clip_stack:
         raise RuntimeError("Clip stack empty")
-    return ctx.clip_stack.items[ctx.clip_stack.idx - 1]
+    return ctx.clip_stack[-1]
 
 
 def check_clip(ctx, r):
     """Check if rectangle is clipped"""
-    cr = get_clip_rect(ctx)
-    if (r.x > cr.x + cr.w or r.x + r.w < cr.x or
-        r.y > cr.y + cr.h or r.y + r.h < cr.y):
-        return MU_CLIP_ALL
-    if (r.x >= cr.x and r.x + r.w <= cr.x + cr.w and
-        r.y >= cr.y and r.y + r.h <= cr.y + cr.h):
-        return 0
-    return MU_CLIP_PART
+    return check_clip_rects(r, ctx.clip_stack[-1])
 
 
 def get_current_container(ctx):
@@ -193,18 +259,24 @@ def bring_to_front(ctx, cnt):
 
 
 # Pool functions
+def _pool_updates(ctx, items):
+    """Get last_update array mirroring a pool"""
+    if items is ctx.container_pool:
+        return ctx.container_pool_updates
+    return ctx.treenode_pool_updates
+
+
 def pool_init(ctx, items, id_val):
     """Initialize pool item"""
-    n = -1
-    f = ctx.frame
-    for i in range(len(items)):
-        if items[i].last_update < f:
-            f = items[i].last_update
-            n = i
-    
-    if n < 0:
+    updates = _pool_updates(ctx, items)
+    f = min(updates)
+    if f >= ctx.frame:
         raise RuntimeError("Pool full")
     
+    n = 0
+    while updates[n] != f:
+        n += 1
+    
     items[n].id = id_val
     pool_update(ctx, items, n)
     return n
@@ -221,6 +293,13 @@ def pool_get(ctx, items, id_val):
 def pool_update(ctx, items, idx):
     """Update pool item"""
     items[idx].last_update = ctx.frame
+    _pool_updates(ctx, items)[idx] = ctx.frame
+
+
+def pool_clear(ctx, items, idx):
+    """Release pool item"""
+    items[idx] = PoolItem()
+    _pool_updates(ctx, items)[idx] = 0
 
 
 # Input handlers
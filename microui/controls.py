@@ -4,12 +4,17 @@ UI controls for microui
 """
 import logging
 from .core import *
-from .context import get_id, set_focus, get_clip_rect, pool_get, pool_update, pool_init
-from .drawing import draw_rect, draw_text, draw_icon, draw_frame
-from .layout import get_layout, layout_next, layout_row, layout_begin_column, layout_end_column
+from .context import get_id, get_id_uncached, set_focus, get_clip_rect, pool_get, pool_update, pool_init, pool_clear
+from .drawing import draw_rect, draw_text, draw_icon, draw_frame, get_text_width
+from .layout import layout_next, layout_row, layout_begin_column, layout_end_column
 
 logger = logging.getLogger(__name__)
 
+# Shared (0, value) results for controls that did not change this frame,
+# so idle frames don't allocate a fresh result tuple per widget
+_UNCHANGED_CACHE_SIZE = const(32)
+_unchanged_cache = {}
+
 
 def in_hover_root(ctx):
     """Check if in hover root"""
@@ -36,30 +41,47 @@ def mouse_over(ctx, rect):
 
 def update_control(ctx, id_val, rect, opt):
     """Update control state"""
-    mouseover = mouse_over(ctx, rect)
-    
-    if ctx.focus == id_val:
+    focused = ctx.focus == id_val
+    if focused:
         ctx.updated_focus = 1
     
     if opt & MU_OPT_NOINTERACT:
         return
     
-    if mouseover and not ctx.mouse_down:
+    mouseover = mouse_over(ctx, rect)
+    mouse_down = ctx.mouse_down
+    mouse_pressed = ctx.mouse_pressed
+    
+    if mouseover and not mouse_down:
         ctx.hover = id_val
     
-    if ctx.focus == id_val:
-        if ctx.mouse_pressed and not mouseover:
+    if focused:
+        if mouse_pressed and not mouseover:
             set_focus(ctx, 0)
-        if not ctx.mouse_down and not (opt & MU_OPT_HOLDFOCUS):
+        elif not mouse_down and not (opt & MU_OPT_HOLDFOCUS):
             set_focus(ctx, 0)
     
     if ctx.hover == id_val:
-        if ctx.mouse_pressed:
+        if mouse_pressed:
             set_focus(ctx, id_val)
         elif not mouseover:
             ctx.hover = 0
 
 
+def _unchanged(value):
+    """Get shared (0, value) result tuple"""
+    try:
+        res = _unchanged_cache.get(value)
+    except TypeError:
+        # Unhashable state (a list, a mutable object): not cached
+        return 0, value
+    if res is None or res[1] is not value:
+        if len(_unchanged_cache) >= _UNCHANGED_CACHE_SIZE:
+            _unchanged_cache.clear()
+        res = _unchanged_cache[value] = (0, value)
+    return res
+
+
 def draw_control_frame(ctx, id_val, rect, colorid, opt):
     """Draw control frame"""
     if opt & MU_OPT_NOFRAME:
@@ -76,7 +98,7 @@ def draw_control_frame(ctx, id_val, rect, colorid, opt):
 def draw_control_text(ctx, text, rect, colorid, opt):
     """Draw control text"""
     font = ctx.style.font
-    tw = ctx.text_width(font, text)
+    tw = get_text_width(ctx, font, text)
     th = ctx.text_height(font)
     
     from .context import push_clip_rect, pop_clip_rect
@@ -88,9 +110,9 @@ def draw_control_text(ctx, text, rect, colorid, opt):
     if opt & MU_OPT_ALIGNCENTER:
         pos.x = rect.x + (rect.w - tw) // 2
     elif opt & MU_OPT_ALIGNRIGHT:
-        pos.x = rect.x + rect.w - tw - ctx.style.padding
+        pos.x = rect.x + rect.w - tw - ctx._padding
     else:
-        pos.x = rect.x + ctx.style.padding
+        pos.x = rect.x + ctx._padding
     
     draw_text(ctx, font, text, pos, ctx.style.colors[colorid])
     pop_clip_rect(ctx)
@@ -111,7 +133,7 @@ def text(ctx, text_str):
     
     for word in words:
         test_line = line + (" " if line else "") + word
-        if ctx.text_width(font, test_line) > get_layout(ctx).body.w:
+        if ctx.text_width(font, test_line) > ctx.layout_stack[-1].body.w:
             if line:
                 r = layout_next(ctx)
                 draw_text(ctx, font, line, Vec2(r.x, r.y), color)
@@ -141,7 +163,7 @@ def button_ex(ctx, label_str, icon, opt):
     if label_str:
         id_val = get_id(ctx, label_str)
     else:
-        id_val = get_id(ctx, str(icon))
+        id_val = get_id_uncached(ctx, str(icon))
     
     r = layout_next(ctx)
     update_control(ctx, id_val, r, opt)
@@ -191,6 +213,8 @@ def checkbox(ctx, label_str, state):
     r = Rect(r.x + box.w, r.y, r.w - box.w, r.h)
     draw_control_text(ctx, label_str, r, MU_COLOR_TEXT, 0)
     
+    if not res:
+        return _unchanged(state)
     return res, state
 
 
@@ -200,7 +224,7 @@ def slider_ex(ctx, value, low, high, step, fmt, opt):
     last = value
     v = last
     
-    id_val = get_id(ctx, str(id(value)))
+    id_val = get_id_uncached(ctx, str(id(value)))
     base = layout_next(ctx)
     
     # Handle normal mode
@@ -231,6 +255,8 @@ def slider_ex(ctx, value, low, high, step, fmt, opt):
     buf = fmt % v
     draw_control_text(ctx, buf, base, MU_COLOR_TEXT, opt)
     
+    if not res:
+        return _unchanged(value)
     return res, value
 
 
@@ -253,7 +279,7 @@ def begin_treenode_ex(ctx, label_str, opt):
     """Begin tree node"""
     res = _header(ctx, label_str, True, opt)
     if res & MU_RES_ACTIVE:
-        get_layout(ctx).indent += ctx.style.indent
+        ctx.layout_stack[-1].indent += ctx.style.indent
         from .context import push_id
         push_id(ctx, ctx.last_id)
     return res
@@ -266,7 +292,7 @@ def begin_treenode(ctx, label_str):
 
 def end_treenode(ctx):
     """End tree node"""
-    get_layout(ctx).indent -= ctx.style.indent
+    ctx.layout_stack[-1].indent -= ctx.style.indent
     from .context import pop_id
     pop_id(ctx)
 
@@ -294,7 +320,7 @@ def _header(ctx, label_str, is_treenode, opt):
         if active:
             pool_update(ctx, ctx.treenode_pool, idx)
         else:
-            ctx.treenode_pool[idx] = PoolItem()
+            pool_clear(ctx, ctx.treenode_pool, idx)
     elif active:
         pool_init(ctx, ctx.treenode_pool, id_val)
     
@@ -309,8 +335,8 @@ def _header(ctx, label_str, is_treenode, opt):
     draw_icon(ctx, icon, Rect(r.x, r.y, r.h, r.h), 
               ctx.style.colors[MU_COLOR_TEXT])
     
-    r.x += r.h - ctx.style.padding
-    r.w -= r.h - ctx.style.padding
+    r.x += r.h - ctx._padding
+    r.w -= r.h - ctx._padding
     draw_control_text(ctx, label_str, r, MU_COLOR_TEXT, 0)
     
     return MU_RES_ACTIVE if expanded else 0
@@ -329,7 +355,9 @@ def canvas(ctx, width, height):
     """
     from .layout import layout_next
     
-    rect = layout_next(ctx)
+    # Copy: layout rects are pooled and the canvas keeps its rect
+    r = layout_next(ctx)
+    rect = Rect(r.x, r.y, r.w, r.h)
     if width > 0 and height > 0:
         rect.w = width
         rect.h = height
@@ -350,8 +378,11 @@ class CanvasContext:
         self.clip_rect = Rect(0, 0, rect.w, rect.h)
     
     def pixel(self, x, y, color):
-        """Draw a pixel at (x, y)"""
-        from .core import CanvasPixelCommand
+        """Draw a pixel at (x, y)
+        
+        Pixels drawn back to back share one CanvasPixelsCommand.
+        """
+        from .core import CanvasPixelsCommand, MU_COMMAND_CANVAS_PIXELS
         from .drawing import push_command
         
         if isinstance(color, tuple):
@@ -359,8 +390,12 @@ class CanvasContext:
                          color[3] if len(color) > 3 else 255)
         
         if (0 <= x < self.rect.w and 0 <= y < self.rect.h):
-            cmd = CanvasPixelCommand(self.rect, x, y, color)
-            push_command(self.ctx, cmd)
+            cmds = self.ctx.command_list
+            cmd = cmds[-1] if cmds else None
+            if (cmd is None or cmd.type != MU_COMMAND_CANVAS_PIXELS or
+                    cmd.canvas_rect is not self.rect):
+                cmd = push_command(self.ctx, CanvasPixelsCommand(self.rect))
+            cmd.add(x, y, color)
     
     def line(self, x1, y1, x2, y2, color):
         """Draw a line from (x1, y1) to (x2, y2)"""
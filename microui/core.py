@@ -5,6 +5,7 @@ Core context and data structures
 """
 import framebuf
 import logging
+from array import array
 from micropython import const
 
 logger = logging.getLogger(__name__)
@@ -14,6 +15,7 @@ MU_VERSION = "2.02-mp"
 
 # Constants
 MU_COMMANDLIST_SIZE = const(256 * 1024)
+MU_COMMANDLIST_INIT = const(256)  # command slots reserved up front
 MU_ROOTLIST_SIZE = const(32)
 MU_CONTAINERSTACK_SIZE = const(32)
 MU_CLIPSTACK_SIZE = const(32)
@@ -23,12 +25,20 @@ MU_CONTAINERPOOL_SIZE = const(48)
 MU_TREENODEPOOL_SIZE = const(48)
 MU_MAX_WIDTHS = const(16)
 MU_MAX_FMT = const(127)
+MU_RECTCOMMANDPOOL_SIZE = const(128)
+MU_TEXTCOMMANDPOOL_SIZE = const(64)
+MU_ICONCOMMANDPOOL_SIZE = const(16)
+MU_CLIPCOMMANDPOOL_SIZE = const(32)
+MU_BOXCOMMANDPOOL_SIZE = const(64)
+MU_LAYOUTRECTPOOL_SIZE = const(32)  # power of two: indexed with a mask
+MU_IDCACHE_SIZE = const(64)
 
 # Clip flags
 MU_CLIP_PART = const(1)
 MU_CLIP_ALL = const(2)
 
 # Command types
+MU_COMMAND_NONE = const(0)  # merged away, skipped by renderers
 MU_COMMAND_JUMP = const(1)
 MU_COMMAND_CLIP = const(2)
 MU_COMMAND_RECT = const(3)
@@ -39,6 +49,8 @@ MU_COMMAND_CANVAS_LINE = const(7)
 MU_COMMAND_CANVAS_RECT = const(8)
 MU_COMMAND_CANVAS_CIRCLE = const(9)
 MU_COMMAND_CANVAS_TEXT = const(10)
+MU_COMMAND_BOX = const(11)
+MU_COMMAND_CANVAS_PIXELS = const(12)
 
 # Color IDs
 MU_COLOR_TEXT = const(0)
@@ -126,21 +138,34 @@ class Rect:
 
 
 class Color:
-    """RGBA Color"""
-    __slots__ = ('r', 'g', 'b', 'a')
+    """RGBA Color
+    
+    Treat as immutable: RGB is stored packed into one small int and the
+    RGB565 value used by the renderer is packed once at construction.
+    """
+    __slots__ = ('_rgb', 'a', '_rgb565')
     
     def __init__(self, r=0, g=0, b=0, a=255):
-        self.r = r
-        self.g = g
-        self.b = b
+        # Alpha kept apart so the packed value stays a small int on 32-bit ports
+        self._rgb = (r << 16) | (g << 8) | b
         self.a = a
+        self._rgb565 = pack_rgb565(r, g, b)
+    
+    @property
+    def r(self):
+        return self._rgb >> 16
+    
+    @property
+    def g(self):
+        return (self._rgb >> 8) & 0xFF
+    
+    @property
+    def b(self):
+        return self._rgb & 0xFF
     
     def to_rgb565(self):
         """Convert to RGB565 format (swap bytes for SPI LCD)"""
-        x = ((self.r & 0xF8) << 8) | ((self.g & 0xFC) << 3) | (self.b >> 3)
-        l = (x>>0)&0xFF
-        h = (x>>8)&0xFF
-        return (l<<8)|(h<<0)
+        return self._rgb565
     
     def __repr__(self):
         return f"Color({self.r}, {self.g}, {self.b}, {self.a})"
@@ -173,34 +198,97 @@ class ClipCommand(Command):
     """Clip command"""
     def __init__(self, rect):
         super().__init__(MU_COMMAND_CLIP, 0)
+        self.set(rect)
+    
+    def set(self, rect):
+        """Refill pooled command"""
         self.rect = rect
+        return self
 
 
 class RectCommand(Command):
-    """Rectangle command"""
-    def __init__(self, rect, color):
-        super().__init__(MU_COMMAND_RECT, 0)
-        self.rect = rect
+    """Rectangle command
+    
+    Stores the already clipped rectangle as flat ints plus the packed
+    RGB565 value; color is kept for renderers that need RGBA.
+    """
+    __slots__ = ('x', 'y', 'w', 'h', 'rgb565', 'color')
+    
+    def __init__(self, x, y, w, h, color):
+        self.type = MU_COMMAND_RECT
+        self.size = 0
+        self.set(x, y, w, h, color)
+    
+    def set(self, x, y, w, h, color):
+        """Refill pooled command"""
+        self.type = MU_COMMAND_RECT
+        self.x = x
+        self.y = y
+        self.w = w
+        self.h = h
+        self.rgb565 = color._rgb565
+        self.color = color
+        return self
+
+
+class BoxCommand(Command):
+    """Box outline command
+    
+    Only pushed for boxes that lie fully inside the clip rect, so the
+    renderer can fill the four 1px edges without clipping.
+    """
+    __slots__ = ('x', 'y', 'w', 'h', 'rgb565', 'color')
+    
+    def __init__(self, x, y, w, h, color):
+        self.type = MU_COMMAND_BOX
+        self.size = 0
+        self.set(x, y, w, h, color)
+    
+    def set(self, x, y, w, h, color):
+        """Refill pooled command"""
+        self.x = x
+        self.y = y
+        self.w = w
+        self.h = h
+        self.rgb565 = color._rgb565
         self.color = color
+        return self
 
 
 class TextCommand(Command):
-    """Text command"""
-    def __init__(self, font, pos, color, text):
+    """Text command (w, h: text size measured at push time)"""
+    def __init__(self, font, pos, color, text, w=0, h=0):
         super().__init__(MU_COMMAND_TEXT, 0)
+        self.set(font, pos, color, text, w, h)
+    
+    def set(self, font, pos, color, text, w, h):
+        """Refill pooled command"""
         self.font = font
         self.pos = pos
         self.color = color
         self.text = text
+        self.w = w
+        self.h = h
+        return self
 
 
 class IconCommand(Command):
     """Icon command"""
     def __init__(self, icon_id, rect, color):
         super().__init__(MU_COMMAND_ICON, 0)
+        self.rect = Rect()
+        self.set(icon_id, rect, color)
+    
+    def set(self, icon_id, rect, color):
+        """Refill pooled command (rect is copied, callers may reuse theirs)"""
         self.id = icon_id
-        self.rect = rect
+        r = self.rect
+        r.x = rect.x
+        r.y = rect.y
+        r.w = rect.w
+        r.h = rect.h
         self.color = color
+        return self
 
 
 class CanvasPixelCommand(Command):
@@ -213,6 +301,31 @@ class CanvasPixelCommand(Command):
         self.color = color
 
 
+class CanvasPixelsCommand(Command):
+    """Run of canvas pixels stored column-wise
+    
+    Consecutive Canvas.pixel calls on the same canvas append to one of
+    these instead of pushing an object per pixel. RGB and alpha are kept
+    apart, as in Color, so every column holds small ints.
+    """
+    def __init__(self, canvas_rect):
+        super().__init__(MU_COMMAND_CANVAS_PIXELS, 0)
+        self.canvas_rect = canvas_rect
+        self.xs = array('h')
+        self.ys = array('h')
+        self.rgb565 = array('H')
+        self.rgb = array('I')
+        self.alpha = array('B')
+    
+    def add(self, x, y, color):
+        """Append one pixel"""
+        self.xs.append(int(x))
+        self.ys.append(int(y))
+        self.rgb565.append(color._rgb565)
+        self.rgb.append(color._rgb)
+        self.alpha.append(color.a)
+
+
 class CanvasLineCommand(Command):
     """Canvas line command"""
     def __init__(self, canvas_rect, x1, y1, x2, y2, color):
@@ -319,6 +432,13 @@ class Style:
             Color(43, 43, 43, 255),      # SCROLLBASE
             Color(30, 30, 30, 255),      # SCROLLTHUMB
         ]
+        self.refresh()
+
+    def refresh(self):
+        """Recompute derived metrics; call after changing size or padding"""
+        self._pad2 = self.padding * 2
+        self._def_w = self.size.x + self._pad2
+        self._def_h = self.size.y + self._pad2
 
 
 class Stack:
@@ -355,25 +475,48 @@ class Stack:
 # Utility functions
 def clamp(x, a, b):
     """Clamp value between a and b"""
-    return max(a, min(b, x))
+    if x > b:
+        x = b
+    if x < a:
+        return a
+    return x
 
 
 def expand_rect(rect, n):
     """Expand rectangle by n pixels"""
-    return Rect(rect.x - n, rect.y - n, rect.w + n * 2, rect.h + n * 2)
+    n2 = n + n
+    return Rect(rect.x - n, rect.y - n, rect.w + n2, rect.h + n2)
 
 
 def intersect_rects(r1, r2):
     """Get intersection of two rectangles"""
-    x1 = max(r1.x, r2.x)
-    y1 = max(r1.y, r2.y)
-    x2 = min(r1.x + r1.w, r2.x + r2.w)
-    y2 = min(r1.y + r1.h, r2.y + r2.h)
-    if x2 < x1:
-        x2 = x1
-    if y2 < y1:
-        y2 = y1
-    return Rect(x1, y1, x2 - x1, y2 - y1)
+    ax = r1.x
+    ay = r1.y
+    bx = r2.x
+    by = r2.y
+    x2 = ax + r1.w
+    y2 = ay + r1.h
+    t = bx + r2.w
+    if t < x2:
+        x2 = t
+    t = by + r2.h
+    if t < y2:
+        y2 = t
+    if bx > ax:
+        ax = bx
+    if by > ay:
+        ay = by
+    if x2 < ax:
+        x2 = ax
+    if y2 < ay:
+        y2 = ay
+    return Rect(ax, ay, x2 - ax, y2 - ay)
+
+
+def rects_overlap(r1, r2):
+    """Check if two rectangles share any area (touching edges don't)"""
+    return (r1.x < r2.x + r2.w and r2.x < r1.x + r1.w and
+            r1.y < r2.y + r2.h and r2.y < r1.y + r1.h)
 
 
 def rect_overlaps_vec2(r, p):
@@ -386,11 +529,66 @@ def hash_data(hash_val, data):
     if isinstance(data, str):
         data = data.encode('utf-8')
     elif isinstance(data, int):
-        data = data.to_bytes(4, 'little')
+        # Hash the 4 little-endian bytes without building a bytes object
+        return fnv1a_u32(hash_val, data & 0xFFFFFFFF)
+    
+    return fnv1a(hash_val, data, len(data))
+
+
+# Integer kernels: viper-compiled on MicroPython, pure Python elsewhere
+try:
+    from ._native import (check_clip_rects, clip_rect_into, fnv1a, fnv1a_u32,
+                          pack_rgb565)
+except (ImportError, AttributeError, NameError, SyntaxError):
+    def check_clip_rects(r, cr):
+        """Check rect r against clip rect cr"""
+        if (r.x > cr.x + cr.w or r.x + r.w < cr.x or
+            r.y > cr.y + cr.h or r.y + r.h < cr.y):
+            return MU_CLIP_ALL
+        if (r.x >= cr.x and r.x + r.w <= cr.x + cr.w and
+            r.y >= cr.y and r.y + r.h <= cr.y + cr.h):
+            return 0
+        return MU_CLIP_PART
+    
+    def clip_rect_into(dst, cr):
+        """Clip the [x, y, w, h] ints in dst to cr in place, 0 if nothing is left"""
+        cx = int(cr.x)
+        cy = int(cr.y)
+        x2 = min(dst[0] + dst[2], cx + int(cr.w))
+        y2 = min(dst[1] + dst[3], cy + int(cr.h))
+        if dst[0] < cx:
+            dst[0] = cx
+        if dst[1] < cy:
+            dst[1] = cy
+        dst[2] = x2 - dst[0]
+        dst[3] = y2 - dst[1]
+        return 1 if dst[2] > 0 and dst[3] > 0 else 0
+    
+    def fnv1a(hash_val, data, n):
+        """32-bit FNV-1a over the first n bytes of data"""
+        for i in range(n):
+            hash_val = ((hash_val ^ data[i]) * 16777619) & 0xFFFFFFFF
+        return hash_val
+    
+    def fnv1a_u32(hash_val, data):
+        """32-bit FNV-1a over the 4 little-endian bytes of data"""
+        hash_val = ((hash_val ^ (data & 0xFF)) * 16777619) & 0xFFFFFFFF
+        hash_val = ((hash_val ^ ((data >> 8) & 0xFF)) * 16777619) & 0xFFFFFFFF
+        hash_val = ((hash_val ^ ((data >> 16) & 0xFF)) * 16777619) & 0xFFFFFFFF
+        return ((hash_val ^ (data >> 24)) * 16777619) & 0xFFFFFFFF
     
-    for byte in data:
-        hash_val = ((hash_val ^ byte) * 16777619) & 0xFFFFFFFF
-    return hash_val
+    def _swap16(x):
+        return ((x & 0xFF) << 8) | (x >> 8)
+    
+    # Per-channel tables, already byte-swapped: the swap is a bit
+    # permutation, so it distributes over the OR of the three fields
+    _R5 = array('H', [_swap16((v & 0xF8) << 8) for v in range(256)])
+    _G6 = array('H', [_swap16((v & 0xFC) << 3) for v in range(256)])
+    _B5 = array('H', [_swap16(v >> 3) for v in range(256)])
+    
+    def pack_rgb565(r, g, b):
+        """Pack RGB888 to byte-swapped RGB565 (SPI LCD order)"""
+        return _R5[r & 0xFF] | _G6[g & 0xFF] | _B5[b & 0xFF]
 
 
 class Context:
@@ -402,15 +600,21 @@ class Context:
         self.text_width = text_width_fn
         self.text_height = text_height_fn
         self.framebuffer = framebuffer
+        self.text_width_cache = {}
         
         # Style
         self.style = Style()
+        self.refresh_style()
         
         # Core state
         self.hover = 0
         self.focus = 0
         self.last_id = 0
         self.last_rect = Rect()
+        # layout_next hands these out round-robin instead of allocating:
+        # copy one to keep it past the next MU_LAYOUTRECTPOOL_SIZE calls
+        self._rect_pool = [Rect() for _ in range(MU_LAYOUTRECTPOOL_SIZE)]
+        self._rect_i = 0
         self.last_zindex = 0
         self.updated_focus = 0
         self.frame = 0
@@ -421,18 +625,53 @@ class Context:
         self.number_edit = 0
         
         # Stacks
-        self.command_list = []
+        # Reserve room for a typical frame; begin() empties the list with
+        # del [:], which keeps the allocation on MicroPython (clear()
+        # shrinks it back and the list regrows every frame). CPython frees
+        # the storage either way, so there it has no effect
+        self.command_list = [None] * MU_COMMANDLIST_INIT
+        del self.command_list[:]
+        
+        # Command pools: draw commands are recycled every frame instead of
+        # being reallocated; a pool grows if a frame needs more commands
+        black = Color()
+        self.rect_cmd_pool = [RectCommand(0, 0, 0, 0, black)
+                              for _ in range(MU_RECTCOMMANDPOOL_SIZE)]
+        self.text_cmd_pool = [TextCommand(None, None, black, "")
+                              for _ in range(MU_TEXTCOMMANDPOOL_SIZE)]
+        self.icon_cmd_pool = [IconCommand(0, Rect(), black)
+                              for _ in range(MU_ICONCOMMANDPOOL_SIZE)]
+        self.clip_cmd_pool = [ClipCommand(None)
+                              for _ in range(MU_CLIPCOMMANDPOOL_SIZE)]
+        self.box_cmd_pool = [BoxCommand(0, 0, 0, 0, black)
+                             for _ in range(MU_BOXCOMMANDPOOL_SIZE)]
+        self.rect_cmd_idx = 0
+        # Scratch [x, y, w, h] for clip_rect_into, so clipping stays on raw ints
+        self.rect_buf = array('i', [0, 0, 0, 0])
+        self.text_cmd_idx = 0
+        self.icon_cmd_idx = 0
+        self.clip_cmd_idx = 0
+        self.box_cmd_idx = 0
         self.root_list = Stack(MU_ROOTLIST_SIZE)
         self.container_stack = Stack(MU_CONTAINERSTACK_SIZE)
-        self.clip_stack = Stack(MU_CLIPSTACK_SIZE)
-        self.id_stack = Stack(MU_IDSTACK_SIZE)
-        self.layout_stack = Stack(MU_LAYOUTSTACK_SIZE)
+        # Plain lists: pushed/read for every control, so skip Stack's method calls
+        self.clip_stack = []
+        self.id_stack = []
+        self.layout_stack = []
+        # String ids by parent id and string identity: id(data) ^ parent ->
+        # (data, parent, id)
+        self._id_cache = {}
         
         # Pools
         self.container_pool = [PoolItem() for _ in range(MU_CONTAINERPOOL_SIZE)]
         self.containers = [Container() for _ in range(MU_CONTAINERPOOL_SIZE)]
         self.treenode_pool = [PoolItem() for _ in range(MU_TREENODEPOOL_SIZE)]
         
+        # Pool last_update frames mirrored as flat int arrays, so pool_init
+        # can find the least recently used slot with a single min() scan
+        self.container_pool_updates = array('i', [0] * MU_CONTAINERPOOL_SIZE)
+        self.treenode_pool_updates = array('i', [0] * MU_TREENODEPOOL_SIZE)
+        
         # Input state
         self.mouse_pos = Vec2()
         self.last_mouse_pos = Vec2()
@@ -448,3 +687,12 @@ class Context:
         self.unclipped_rect = Rect(0, 0, 0x1000000, 0x1000000)
         
         logger.debug("Context initialized successfully")
+    
+    def refresh_style(self):
+        """Re-cache the style metrics read on hot paths (done every begin)"""
+        style = self.style
+        style.refresh()
+        self._padding = style.padding
+        self._spacing = style.spacing
+        self._scrollbar_size = style.scrollbar_size
+        self._title_height = style.title_height
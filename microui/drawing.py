@@ -3,6 +3,7 @@
 Drawing functions for microui
 """
 import logging
+from array import array
 from .core import *
 
 logger = logging.getLogger(__name__)
@@ -15,7 +16,12 @@ def push_command(ctx, cmd):
 
 
 def next_command(ctx):
-    """Iterator for commands - simplified version"""
+    """Iterator for commands - simplified version
+    
+    Deprecated: render_commands iterates ctx.command_list directly and skips
+    jumps inline, which avoids a generator resume per command. Kept for
+    external callers.
+    """
     for cmd in ctx.command_list:
         # Skip jump commands, just yield regular commands
         if cmd.type != MU_COMMAND_JUMP:
@@ -31,43 +37,120 @@ def push_jump(ctx, dst):
 
 def set_clip(ctx, rect):
     """Set clip rectangle"""
-    cmd = ClipCommand(rect)
+    i = ctx.clip_cmd_idx
+    ctx.clip_cmd_idx = i + 1
+    pool = ctx.clip_cmd_pool
+    if i < len(pool):
+        cmd = pool[i].set(rect)
+    else:
+        cmd = ClipCommand(rect)
+        pool.append(cmd)
     push_command(ctx, cmd)
 
 
 def draw_rect(ctx, rect, color):
     """Draw filled rectangle"""
-    rect = intersect_rects(rect, get_clip_rect(ctx))
-    if rect.w > 0 and rect.h > 0:
-        cmd = RectCommand(rect, color)
+    _draw_rect(ctx, rect.x, rect.y, rect.w, rect.h, color)
+
+
+def _draw_rect(ctx, x, y, w, h, color):
+    """Draw filled rectangle"""
+    # Clip once here so the renderer can fill without re-clipping; rects
+    # built from floats are truncated to fit the int scratch buffer
+    buf = ctx.rect_buf
+    buf[0] = int(x)
+    buf[1] = int(y)
+    buf[2] = int(w)
+    buf[3] = int(h)
+    if clip_rect_into(buf, ctx.clip_stack[-1]):
+        x = buf[0]
+        y = buf[1]
+        w = buf[2]
+        h = buf[3]
+        i = ctx.rect_cmd_idx
+        ctx.rect_cmd_idx = i + 1
+        pool = ctx.rect_cmd_pool
+        if i < len(pool):
+            cmd = pool[i].set(x, y, w, h, color)
+        else:
+            cmd = RectCommand(x, y, w, h, color)
+            pool.append(cmd)
         push_command(ctx, cmd)
 
 
 def draw_box(ctx, rect, color):
     """Draw rectangle outline"""
+    _draw_box(ctx, rect.x, rect.y, rect.w, rect.h, color)
+
+
+def _draw_box(ctx, x, y, w, h, color):
+    """Draw rectangle outline"""
+    x = int(x)
+    y = int(y)
+    w = int(w)
+    h = int(h)
+    # Common case: box fully inside the clip rect, push a single command
+    cr = ctx.clip_stack[-1]
+    if (w > 2 and h > 2 and x >= cr.x and y >= cr.y and
+        x + w <= cr.x + cr.w and y + h <= cr.y + cr.h):
+        i = ctx.box_cmd_idx
+        ctx.box_cmd_idx = i + 1
+        pool = ctx.box_cmd_pool
+        if i < len(pool):
+            cmd = pool[i].set(x, y, w, h, color)
+        else:
+            cmd = BoxCommand(x, y, w, h, color)
+            pool.append(cmd)
+        push_command(ctx, cmd)
+        return
+    
     # Top
-    draw_rect(ctx, Rect(rect.x + 1, rect.y, rect.w - 2, 1), color)
+    _draw_rect(ctx, x + 1, y, w - 2, 1, color)
     # Bottom
-    draw_rect(ctx, Rect(rect.x + 1, rect.y + rect.h - 1, rect.w - 2, 1), color)
+    _draw_rect(ctx, x + 1, y + h - 1, w - 2, 1, color)
     # Left
-    draw_rect(ctx, Rect(rect.x, rect.y, 1, rect.h), color)
+    _draw_rect(ctx, x, y, 1, h, color)
     # Right
-    draw_rect(ctx, Rect(rect.x + rect.w - 1, rect.y, 1, rect.h), color)
+    _draw_rect(ctx, x + w - 1, y, 1, h, color)
+
+
+def get_text_width(ctx, font, text):
+    """Get text width, cached for the current frame"""
+    key = (id(font), text)
+    w = ctx.text_width_cache.get(key)
+    if w is None:
+        w = ctx.text_width_cache[key] = ctx.text_width(font, text)
+    return w
 
 
 def draw_text(ctx, font, text, pos, color):
     """Draw text"""
-    text_w = ctx.text_width(font, text)
+    text_w = get_text_width(ctx, font, text)
     text_h = ctx.text_height(font)
+    if text_w <= 0 or text_h <= 0:
+        return
     rect = Rect(pos.x, pos.y, text_w, text_h)
     
     clipped = check_clip(ctx, rect)
     if clipped == MU_CLIP_ALL:
         return
     if clipped == MU_CLIP_PART:
-        set_clip(ctx, get_clip_rect(ctx))
+        # Drop text that only touches the clip edge here, so the renderer
+        # never has to intersect it
+        cr = ctx.clip_stack[-1]
+        if (min(rect.x + text_w, cr.x + cr.w) <= max(rect.x, cr.x) or
+            min(rect.y + text_h, cr.y + cr.h) <= max(rect.y, cr.y)):
+            return
+        set_clip(ctx, cr)
     
-    cmd = TextCommand(font, pos, color, text)
+    i = ctx.text_cmd_idx
+    ctx.text_cmd_idx = i + 1
+    pool = ctx.text_cmd_pool
+    if i < len(pool):
+        cmd = pool[i].set(font, pos, color, text, text_w, text_h)
+    else:
+        cmd = TextCommand(font, pos, color, text, text_w, text_h)
+        pool.append(cmd)
     push_command(ctx, cmd)
     
     if clipped:
@@ -82,7 +165,14 @@ def draw_icon(ctx, icon_id, rect, color):
     if clipped == MU_CLIP_PART:
         set_clip(ctx, get_clip_rect(ctx))
     
-    cmd = IconCommand(icon_id, rect, color)
+    i = ctx.icon_cmd_idx
+    ctx.icon_cmd_idx = i + 1
+    pool = ctx.icon_cmd_pool
+    if i < len(pool):
+        cmd = pool[i].set(icon_id, rect, color)
+    else:
+        cmd = IconCommand(icon_id, rect, color)
+        pool.append(cmd)
     push_command(ctx, cmd)
     
     if clipped:
@@ -91,15 +181,21 @@ def draw_icon(ctx, icon_id, rect, color):
 
 def draw_frame(ctx, rect, colorid):
     """Draw control frame"""
-    draw_rect(ctx, rect, ctx.style.colors[colorid])
+    colors = ctx.style.colors
+    x = rect.x
+    y = rect.y
+    w = rect.w
+    h = rect.h
+    _draw_rect(ctx, x, y, w, h, colors[colorid])
     
     # Skip border for certain elements
     if colorid in (MU_COLOR_SCROLLBASE, MU_COLOR_SCROLLTHUMB, MU_COLOR_TITLEBG):
         return
     
-    # Draw border
-    if ctx.style.colors[MU_COLOR_BORDER].a:
-        draw_box(ctx, expand_rect(rect, 1), ctx.style.colors[MU_COLOR_BORDER])
+    # Draw border (rect expanded by 1)
+    border = colors[MU_COLOR_BORDER]
+    if border.a:
+        _draw_box(ctx, x - 1, y - 1, w + 2, h + 2, border)
 
 
 # Rendering to framebuffer
@@ -107,54 +203,50 @@ def render_commands(ctx):
     """Render all commands to framebuffer"""
     logger.debug(f"Rendering {len(ctx.command_list)} commands")
     
+    if _render_all is not None:
+        _render_all(ctx)
+        return
+    
+    dispatch = _RENDER_DISPATCH
+    fb = ctx.framebuffer
     clip_rect = None
- 
-    for cmd in next_command(ctx):
-        if cmd.type == MU_COMMAND_JUMP:
-            logger.debug(f"Jump to command at {cmd.dst}")
-            # In this simplified version, we just continue
-            continue
-        
-        elif cmd.type == MU_COMMAND_CLIP:
-            clip_rect = cmd.rect
-            logger.debug(f"Set clip: {clip_rect}")
-            
-        elif cmd.type == MU_COMMAND_RECT:
-            _render_rect(ctx, cmd.rect, cmd.color, clip_rect)
-            
-        elif cmd.type == MU_COMMAND_TEXT:
-            _render_text(ctx, cmd, clip_rect)
-            
-        elif cmd.type == MU_COMMAND_ICON:
-            _render_icon(ctx, cmd, clip_rect)
-        
-        elif cmd.type == MU_COMMAND_CANVAS_PIXEL:
-            _render_pixel(ctx, cmd, clip_rect)
-        
-        elif cmd.type == MU_COMMAND_CANVAS_LINE:
-            _render_line(ctx, cmd, clip_rect)
-        
-        elif cmd.type == MU_COMMAND_CANVAS_RECT:
-            _render_canvas_rect(ctx, cmd, clip_rect)
-        
-        elif cmd.type == MU_COMMAND_CANVAS_CIRCLE:
-            _render_canvas_circle(ctx, cmd, clip_rect)
-        
-        elif cmd.type == MU_COMMAND_CANVAS_TEXT:
-            _render_canvas_text(ctx, cmd, clip_rect)
-        
-        
-def _render_pixel(ctx, cmd, clip_rect):
+    
+    # Jump commands have no handler; in this simplified version they are
+    # just skipped
+    for cmd in ctx.command_list:
+        handler = dispatch.get(cmd.type)
+        if handler is not None:
+            clip_rect = handler(fb, cmd, clip_rect) or clip_rect
+
+
+def _render_clip(fb, cmd, clip_rect):
+    """Switch render clip rectangle"""
+    return cmd.rect
+
+
+def _render_pixel(fb, cmd, clip_rect):
     """Render pixel to framebuffer"""
     # Translate canvas coordinates to screen coordinates
     screen_x = int(cmd.canvas_rect.x + cmd.x)
     screen_y = int(cmd.canvas_rect.y + cmd.y)
     
-    rgb565 = int(cmd.color.to_rgb565())
-    ctx.framebuffer.pixel(screen_x, screen_y, rgb565)
+    rgb565 = cmd.color._rgb565
+    fb.pixel(screen_x, screen_y, rgb565)
+
 
+def _render_pixels(fb, cmd, clip_rect):
+    """Render a run of canvas pixels to framebuffer"""
+    ox = int(cmd.canvas_rect.x)
+    oy = int(cmd.canvas_rect.y)
+    xs = cmd.xs
+    ys = cmd.ys
+    rgb565 = cmd.rgb565
+    pixel = fb.pixel
+    for i in range(len(xs)):
+        pixel(ox + xs[i], oy + ys[i], rgb565[i])
 
-def _render_line(ctx, cmd, clip_rect):
+
+def _render_line(fb, cmd, clip_rect):
     """Render line to framebuffer"""
     # Translate canvas coordinates to screen coordinates
     screen_x1 = int(cmd.canvas_rect.x + cmd.x1)
@@ -162,141 +254,216 @@ def _render_line(ctx, cmd, clip_rect):
     screen_x2 = int(cmd.canvas_rect.x + cmd.x2)
     screen_y2 = int(cmd.canvas_rect.y + cmd.y2)
     
-    rgb565 = int(cmd.color.to_rgb565())
-    ctx.framebuffer.line(screen_x1, screen_y1, screen_x2, screen_y2, rgb565)
+    rgb565 = cmd.color._rgb565
+    fb.line(screen_x1, screen_y1, screen_x2, screen_y2, rgb565)
 
 
-def _render_canvas_rect(ctx, cmd, clip_rect):
+def _render_canvas_rect(fb, cmd, clip_rect):
     """Render canvas rectangle to framebuffer"""
     # Translate canvas coordinates to screen coordinates
     screen_x = int(cmd.canvas_rect.x + cmd.x)
     screen_y = int(cmd.canvas_rect.y + cmd.y)
     
-    rgb565 = int(cmd.color.to_rgb565())
+    rgb565 = cmd.color._rgb565
     
     if cmd.filled:
         # Draw filled rectangle
-        ctx.framebuffer.fill_rect(screen_x, screen_y, int(cmd.w), int(cmd.h), rgb565)
+        fb.fill_rect(screen_x, screen_y, int(cmd.w), int(cmd.h), rgb565)
     else:
         # Draw rectangle outline
+        line = fb.line
         # Top
-        ctx.framebuffer.line(screen_x, screen_y, int(screen_x + cmd.w - 1), screen_y, rgb565)
+        line(screen_x, screen_y, int(screen_x + cmd.w - 1), screen_y, rgb565)
         # Bottom
-        ctx.framebuffer.line(screen_x, int(screen_y + cmd.h - 1), int(screen_x + cmd.w - 1), int(screen_y + cmd.h - 1), rgb565)
+        line(screen_x, int(screen_y + cmd.h - 1), int(screen_x + cmd.w - 1), int(screen_y + cmd.h - 1), rgb565)
         # Left
-        ctx.framebuffer.line(screen_x, screen_y, screen_x, int(screen_y + cmd.h - 1), rgb565)
+        line(screen_x, screen_y, screen_x, int(screen_y + cmd.h - 1), rgb565)
         # Right
-        ctx.framebuffer.line(int(screen_x + cmd.w - 1), screen_y, int(screen_x + cmd.w - 1), int(screen_y + cmd.h - 1), rgb565)
+        line(int(screen_x + cmd.w - 1), screen_y, int(screen_x + cmd.w - 1), int(screen_y + cmd.h - 1), rgb565)
 
 
-def _render_canvas_circle(ctx, cmd, clip_rect):
+def _render_canvas_circle(fb, cmd, clip_rect):
     """Render canvas circle to framebuffer"""
     # Translate canvas coordinates to screen coordinates
     screen_x = int(cmd.canvas_rect.x + cmd.x)
     screen_y = int(cmd.canvas_rect.y + cmd.y)
     
-    rgb565 = int(cmd.color.to_rgb565())
+    rgb565 = cmd.color._rgb565
     
     if cmd.filled:
         # For filled circles, we need to draw multiple circles or use a fill algorithm
         # Since framebuf.ellipse only draws outline, we'll fill by drawing concentric circles
 #         for r in range(cmd.radius, 0, -1):
-        ctx.framebuffer.ellipse(screen_x, screen_y, int(cmd.radius), int(cmd.radius), rgb565, 1, 0x0F)
+        fb.ellipse(screen_x, screen_y, int(cmd.radius), int(cmd.radius), rgb565, 1, 0x0F)
     else:
         # Draw circle outline using ellipse
-        ctx.framebuffer.ellipse(screen_x, screen_y, int(cmd.radius), int(cmd.radius), rgb565, 0, 0x0F)
+        fb.ellipse(screen_x, screen_y, int(cmd.radius), int(cmd.radius), rgb565, 0, 0x0F)
 
 
-def _render_canvas_text(ctx, cmd, clip_rect):
+def _render_canvas_text(fb, cmd, clip_rect):
     """Render canvas text to framebuffer"""
     # Translate canvas coordinates to screen coordinates
     screen_x = int(cmd.canvas_rect.x + cmd.x)
     screen_y = int(cmd.canvas_rect.y + cmd.y)
     
-    rgb565 = int(cmd.color.to_rgb565())
-    ctx.framebuffer.text(cmd.text, screen_x, screen_y, rgb565)
+    rgb565 = cmd.color._rgb565
+    fb.text(cmd.text, screen_x, screen_y, rgb565)
 
 
-def _render_rect(ctx, rect, color, clip_rect):
-    """Render rectangle to framebuffer"""
-    if clip_rect:
-        rect = intersect_rects(rect, clip_rect)
-    
-    if rect.w <= 0 or rect.h <= 0:
-        return
-    
-    # Convert color to RGB565
-    rgb565 = int(color.to_rgb565())
-    
-    # Fill rectangle
-    ctx.framebuffer.fill_rect(int(rect.x), int(rect.y), int(rect.w), int(rect.h), rgb565)
+def _render_rect(fb, cmd, clip_rect):
+    """Render rectangle to framebuffer (clipped by draw_rect)"""
+    fb.fill_rect(cmd.x, cmd.y, cmd.w, cmd.h, cmd.rgb565)
 
 
-def _render_text(ctx, cmd, clip_rect):
-    """Render text to framebuffer"""
-    rect = Rect(cmd.pos.x, cmd.pos.y, 
-                ctx.text_width(cmd.font, cmd.text),
-                ctx.text_height(cmd.font))
-    
-    if clip_rect:
-        rect = intersect_rects(rect, clip_rect)
-    
-    if rect.w <= 0 or rect.h <= 0:
-        return
-    
-    # Convert color to RGB565
-    rgb565 = int(cmd.color.to_rgb565())
-    
-    # Draw text
-    ctx.framebuffer.text(cmd.text, int(cmd.pos.x), int(cmd.pos.y), rgb565)
+def _render_box(fb, cmd, clip_rect):
+    """Render box outline to framebuffer (clip checked by draw_box)"""
+    fill_rect = fb.fill_rect
+    x = cmd.x
+    y = cmd.y
+    w = cmd.w
+    h = cmd.h
+    c = cmd.rgb565
+    fill_rect(x + 1, y, w - 2, 1, c)
+    fill_rect(x + 1, y + h - 1, w - 2, 1, c)
+    fill_rect(x, y, 1, h, c)
+    fill_rect(x + w - 1, y, 1, h, c)
+
+
+def _render_text(fb, cmd, clip_rect):
+    """Render text to framebuffer (clip checked by draw_text)"""
+    fb.text(cmd.text, int(cmd.pos.x), int(cmd.pos.y), cmd.color._rgb565)
 
 
-def _render_icon(ctx, cmd, clip_rect):
+def _render_icon(fb, cmd, clip_rect):
     """Render icon to framebuffer"""
+    rect = cmd.rect
     if clip_rect:
-        rect = intersect_rects(cmd.rect, clip_rect)
-    else:
-        rect = cmd.rect
+        # Skip icons entirely outside the clip before building a new rect
+        if not rects_overlap(rect, clip_rect):
+            return
+        rect = intersect_rects(rect, clip_rect)
     
     if rect.w <= 0 or rect.h <= 0:
         return
     
-    rgb565 = int(cmd.color.to_rgb565())
+    shape = _ICON_CACHE.get((cmd.id, rect.w, rect.h))
+    if shape is None:
+        shape = _icon_shape(cmd.id, rect.w, rect.h)
+    lines, poly = shape
     
-    # Draw simple icon shapes
-    if cmd.id == MU_ICON_CLOSE:
+    x = int(rect.x)
+    y = int(rect.y)
+    rgb565 = cmd.color._rgb565
+    if poly is not None:
+        fb.poly(x, y, poly, rgb565, True)
+    line = fb.line
+    for x1, y1, x2, y2 in lines:
+        line(x + x1, y + y1, x + x2, y + y2, rgb565)
+
+
+_ICON_CACHE_SIZE = const(32)
+_ICON_CACHE = {}
+
+
+def _icon_shape(icon_id, w, h):
+    """Build and cache an icon as (line segments, filled polygon or None),
+    relative to its rect origin"""
+    w = int(w)
+    h = int(h)
+    lines = ()
+    poly = None
+    if icon_id == MU_ICON_CLOSE:
         # X shape
-        x1, y1 = int(rect.x + 2), int(rect.y + 2)
-        x2, y2 = int(rect.x + rect.w - 2), int(rect.y + rect.h - 2)
-        ctx.framebuffer.line(x1, y1, x2, y2, rgb565)
-        ctx.framebuffer.line(x2, y1, x1, y2, rgb565)
+        lines = ((2, 2, w - 2, h - 2), (w - 2, 2, 2, h - 2))
         
-    elif cmd.id == MU_ICON_CHECK:
+    elif icon_id == MU_ICON_CHECK:
         # Checkmark
-        x1 = int(rect.x + rect.w // 4)
-        y1 = int(rect.y + rect.h // 2)
-        x2 = int(rect.x + rect.w // 2)
-        y2 = int(rect.y + rect.h - 3)
-        x3 = int(rect.x + rect.w - 3)
-        y3 = int(rect.y + 3)
-        ctx.framebuffer.line(x1, y1, x2, y2, rgb565)
-        ctx.framebuffer.line(x2, y2, x3, y3, rgb565)
+        x1, y1 = w // 4, h // 2
+        x2, y2 = w // 2, h - 3
+        lines = ((x1, y1, x2, y2), (x2, y2, w - 3, 3))
         
-    elif cmd.id == MU_ICON_COLLAPSED:
+    elif icon_id == MU_ICON_COLLAPSED:
         # Right arrow
-        x = int(rect.x + rect.w // 3)
-        y = int(rect.y + rect.h // 2)
-        for i in range(int(rect.h // 3)):
-            ctx.framebuffer.line(x, int(y - i), int(x + i), y, rgb565)
-            ctx.framebuffer.line(x, int(y + i), int(x + i), y, rgb565)
+        x = w // 3
+        y = h // 2
+        n = h // 3 - 1
+        if n >= 0:
+            poly = array('h', [x, y - n, x, y + n, x + n, y])
             
-    elif cmd.id == MU_ICON_EXPANDED:
+    elif icon_id == MU_ICON_EXPANDED:
         # Down arrow
-        x = int(rect.x + rect.w // 2)
-        y = int(rect.y + rect.h // 3)
-        for i in range(int(rect.w // 3)):
-            ctx.framebuffer.line(int(x - i), y, x, int(y + i), rgb565)
-            ctx.framebuffer.line(int(x + i), y, x, int(y + i), rgb565)
+        x = w // 2
+        y = h // 3
+        n = w // 3 - 1
+        if n >= 0:
+            poly = array('h', [x - n, y, x + n, y, x, y + n])
+    
+    shape = (lines, poly)
+    if len(_ICON_CACHE) >= _ICON_CACHE_SIZE:
+        _ICON_CACHE.clear()
+    _ICON_CACHE[(icon_id, w, h)] = shape
+    return shape
+
+
+# Command type -> render handler; handlers return a new clip rect or None
+_RENDER_DISPATCH = {
+    MU_COMMAND_CLIP: _render_clip,
+    MU_COMMAND_RECT: _render_rect,
+    MU_COMMAND_BOX: _render_box,
+    MU_COMMAND_TEXT: _render_text,
+    MU_COMMAND_ICON: _render_icon,
+    MU_COMMAND_CANVAS_PIXEL: _render_pixel,
+    MU_COMMAND_CANVAS_PIXELS: _render_pixels,
+    MU_COMMAND_CANVAS_LINE: _render_line,
+    MU_COMMAND_CANVAS_RECT: _render_canvas_rect,
+    MU_COMMAND_CANVAS_CIRCLE: _render_canvas_circle,
+    MU_COMMAND_CANVAS_TEXT: _render_canvas_text,
+}
+
+
+# Hot command types rendered inline rather than through a handler call
+_RENDER_INLINE = {
+    MU_COMMAND_RECT: "fill_rect(cmd.x, cmd.y, cmd.w, cmd.h, cmd.rgb565)",
+    MU_COMMAND_TEXT: "text(cmd.text, int(cmd.pos.x), int(cmd.pos.y), cmd.color._rgb565)",
+    MU_COMMAND_CLIP: "clip_rect = cmd.rect",
+}
+
+
+def _build_render_all():
+    """Generate a straight-line renderer for the command types in
+    _RENDER_DISPATCH: type ids become literal ints and handlers globals of
+    the generated function, so the per-command dict lookup goes away"""
+    order = [MU_COMMAND_RECT, MU_COMMAND_TEXT, MU_COMMAND_CLIP, MU_COMMAND_BOX]
+    order += [t for t in _RENDER_DISPATCH if t not in order]
+    src = [
+        "def render_all(ctx):",
+        "    fb = ctx.framebuffer",
+        "    fill_rect = fb.fill_rect",
+        "    text = fb.text",
+        "    clip_rect = None",
+        "    for cmd in ctx.command_list:",
+        "        t = cmd.type",
+    ]
+    ns = {}
+    kw = "if"
+    for t in order:
+        src.append("        %s t == %d:" % (kw, t))
+        if t in _RENDER_INLINE:
+            src.append("            " + _RENDER_INLINE[t])
+        else:
+            ns["render_%d" % t] = _RENDER_DISPATCH[t]
+            src.append("            clip_rect = render_%d(fb, cmd, clip_rect) or clip_rect" % t)
+        kw = "elif"
+    exec("\n".join(src), ns)
+    return ns["render_all"]
+
+
+try:
+    _render_all = _build_render_all()
+except Exception as e:
+    # Ports built without the compiler fall back to the dispatch loop
+    logger.warning(f"Using dispatch renderer: {e}")
+    _render_all = None
 
 
 # Import get_clip_rect from context
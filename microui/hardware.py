@@ -4,119 +4,206 @@ Hardware integration for displays and touch sensors
 """
 import asyncio
 import logging
+import sys
+from array import array
 from machine import Pin, I2C, SPI
 from micropython import const
+from .context import begin, end, input_mousemove, input_mousedown, input_mouseup
+from .drawing import render_commands
+from .core import (MU_COMMAND_NONE, MU_COMMAND_JUMP, MU_COMMAND_CLIP,
+                   MU_COMMAND_RECT, MU_COMMAND_BOX, MU_COMMAND_ICON)
 
 logger = logging.getLogger(__name__)
 
+# Touch decoding: viper-compiled on MicroPython, pure Python elsewhere
+try:
+    from ._native import parse_ft6236
+except (ImportError, AttributeError, NameError, SyntaxError):
+    def parse_ft6236(data, out, max_points):
+        """Decode FT6236 registers from 0x02 (count byte first) into out as
+        [x, y, pressed, ...], zeroing unused slots; returns the number of
+        points"""
+        n = min(data[0] & 0x0F, max_points)
+        for i in range(n):
+            o = 1 + i * 6
+            j = i * 3
+            out[j] = ((data[o] & 0x0F) << 8) | data[o + 1]
+            out[j + 1] = ((data[o + 2] & 0x0F) << 8) | data[o + 3]
+            # Event 0 (down) or 2 (contact) have bit 6 clear
+            out[j + 2] = ((data[o] >> 6) & 1) ^ 1
+        for j in range(n * 3, max_points * 3):
+            out[j] = 0
+        return n
+
 # Touch sensor constants
 FT6236_ADDR = const(0x38)
 FT6236_REG_TOUCH_COUNT = const(0x02)
 FT6236_REG_P1_XH = const(0x03)
+FT6236_MAX_POINTS = const(2)
+
+# Touch filtering defaults
+TOUCH_DEBOUNCE_N = const(2)     # equal samples needed to commit a press/release
+TOUCH_DEADBAND = const(3)       # pixels a contact must move to report a move
+
+# Display commands (ILI9341/ST7735)
+LCD_CASET = const(0x2A)
+LCD_RASET = const(0x2B)
+LCD_RAMWR = const(0x2C)
+
+# RP2040 SPI TX data registers and DMA request lines, indexed by SPI id
+_RP2_SPI_DR = (0x4003C008, 0x40040008)
+_RP2_DREQ_SPI_TX = (16, 18)
+# RP2040 SPI status registers (SSPSR) and their busy bit
+_RP2_SPI_SR = (0x4003C00C, 0x4004000C)
+_RP2_SSPSR_BSY = const(0x10)
 
 
 class I2CTouchScreen:
     """I2C touch screen driver (FT6236/FT6206)"""
     
-    def __init__(self, i2c, addr=FT6236_ADDR):
+    def __init__(self, i2c, addr=FT6236_ADDR, fast_ms=10, slow_ms=150,
+                 debounce_n=TOUCH_DEBOUNCE_N, deadband=TOUCH_DEADBAND):
         """
         Initialize touch screen
         
         Args:
             i2c: I2C bus object
             addr: I2C address of touch controller
+            fast_ms: Polling interval while the panel is touched
+            slow_ms: Polling interval while idle
+            debounce_n: Consecutive samples needed to commit a press/release
+            deadband: Minimum move in pixels reported while pressed
         """
         self.i2c = i2c
         self.addr = addr
-        self.touch_points = []
+        self.fast_ms = fast_ms
+        self.slow_ms = slow_ms
+        self.debounce_n = debounce_n
+        self.deadband = deadband
+        self._buf = bytearray(1 + 6 * FT6236_MAX_POINTS)
+        self._pts = array('i', [0] * 3 * FT6236_MAX_POINTS)
+        # Non-blocking bus read if the port provides one
+        self._read_into_async = getattr(i2c, 'readfrom_mem_into_async', None)
         logger.info(f"I2C Touch initialized at addr 0x{addr:02x}")
     
     def read_touch(self):
         """
         Read touch points
         
+        Reads into a preallocated buffer and decodes into a shared array, so
+        polling allocates nothing. The returned array is reused by the next
+        call: treat it as read-only and copy it to keep it.
+        
         Returns:
-            List of (x, y, pressed) tuples
+            array('i') of [x, y, pressed] per point (first point at 0..2,
+            slots past the touch count zeroed), or None if the panel isn't
+            touched
         """
         try:
-            # Read number of touch points
-            count_data = self.i2c.readfrom_mem(self.addr, FT6236_REG_TOUCH_COUNT, 1)
-            count = count_data[0] & 0x0F
-            
-            if count == 0:
-                return []
-            
-            # Read touch data (6 bytes per point)
-            data = self.i2c.readfrom_mem(self.addr, FT6236_REG_P1_XH, 6 * count)
-            
-            points = []
-            for i in range(count):
-                offset = i * 6
-                
-                # Parse coordinates
-                x_high = data[offset] & 0x0F
-                x_low = data[offset + 1]
-                y_high = data[offset + 2] & 0x0F
-                y_low = data[offset + 3]
-                
-                x = (x_high << 8) | x_low
-                y = (y_high << 8) | y_low
-                
-                # Event type (0 = down, 1 = up, 2 = contact)
-                event = (data[offset] >> 6) & 0x03
-                pressed = event in (0, 2)
-                
-                points.append((x, y, pressed))
-            
-            return points
+            # Count and point registers are contiguous: read them in one
+            # transaction (6 bytes per point after the count byte)
+            self.i2c.readfrom_mem_into(self.addr, FT6236_REG_TOUCH_COUNT, self._buf)
+            if parse_ft6236(self._buf, self._pts, FT6236_MAX_POINTS) == 0:
+                return None
+            return self._pts
             
         except Exception as e:
             logger.error(f"Touch read error: {e}")
-            return []
+            return None
     
-    async def poll_async(self, ctx, interval_ms=50):
+    async def read_touch_async(self):
+        """
+        Read touch points, letting other tasks run around the I2C transfer
+        
+        Awaits the bus read when the I2C object has readfrom_mem_into_async;
+        otherwise reads synchronously and then yields once, so the display
+        task gets a turn between the read and the input dispatch.
+        
+        Returns:
+            Same as read_touch
+        """
+        read = self._read_into_async
+        if read is None:
+            point = self.read_touch()
+            await asyncio.sleep_ms(0)
+            return point
+        
+        try:
+            await read(self.addr, FT6236_REG_TOUCH_COUNT, self._buf)
+        except Exception as e:
+            logger.error(f"Touch read error: {e}")
+            return None
+        if parse_ft6236(self._buf, self._pts, FT6236_MAX_POINTS) == 0:
+            return None
+        return self._pts
+    
+    async def poll_async(self, ctx, interval_ms=None):
         """
         Async polling loop for touch events
         
+        Polls every fast_ms while touched and every slow_ms while idle, so
+        an untouched panel costs few I2C reads and a touched one stays
+        responsive.
+        
         Args:
             ctx: microui context
-            interval_ms: Polling interval in milliseconds
+            interval_ms: Fixed polling interval in milliseconds (optional,
+                overrides fast_ms/slow_ms)
         """
-        logger.info(f"Starting touch polling (interval={interval_ms}ms)")
+        fast_ms = self.fast_ms if interval_ms is None else interval_ms
+        slow_ms = self.slow_ms if interval_ms is None else interval_ms
+        logger.info(f"Starting touch polling (interval={fast_ms}/{slow_ms}ms)")
+        mm, md, mu = input_mousemove, input_mousedown, input_mouseup
+        read_touch = self.read_touch_async
+        debounce_n = self.debounce_n
+        deadband = self.deadband
         last_pressed = False
+        last_x = last_y = 0
+        pending = 0  # consecutive samples disagreeing with last_pressed
         
         while True:
-            points = self.read_touch()
+            point = await read_touch()
             
-            if points:
-                x, y, pressed = points[0]  # Use first touch point
-                
-                from .context import input_mousemove, input_mousedown, input_mouseup
-                
-                if pressed and not last_pressed:
-                    input_mousedown(ctx, x, y, 1)
-                    logger.debug(f"Touch down: ({x}, {y})")
-                elif not pressed and last_pressed:
-                    input_mouseup(ctx, x, y, 1)
-                    logger.debug(f"Touch up: ({x}, {y})")
-                elif pressed:
-                    input_mousemove(ctx, x, y)
-                
-                last_pressed = pressed
+            if point is not None:
+                x = point[0]
+                y = point[1]
+                pressed = point[2]
             else:
-                if last_pressed:
-                    # Touch released
-                    from .context import input_mouseup
-                    input_mouseup(ctx, ctx.mouse_pos.x, ctx.mouse_pos.y, 1)
-                    last_pressed = False
+                pressed = False
             
-            await asyncio.sleep_ms(interval_ms)
+            if pressed != last_pressed:
+                # Debounce: commit the edge only once it has been stable
+                pending += 1
+                if pending >= debounce_n:
+                    pending = 0
+                    last_pressed = pressed
+                    if pressed:
+                        md(ctx, x, y, 1)
+                        last_x, last_y = x, y
+                        logger.debug(f"Touch down: ({x}, {y})")
+                    else:
+                        if point is None:
+                            x, y = ctx.mouse_pos.x, ctx.mouse_pos.y
+                        mu(ctx, x, y, 1)
+                        logger.debug(f"Touch up: ({x}, {y})")
+            else:
+                pending = 0
+                # Ignore jitter below the deadband while held
+                if pressed and (abs(x - last_x) >= deadband or
+                                abs(y - last_y) >= deadband):
+                    mm(ctx, x, y)
+                    last_x, last_y = x, y
+            
+            await asyncio.sleep_ms(fast_ms if last_pressed or pending else slow_ms)
 
 
 class SPIDisplay:
     """SPI display driver wrapper"""
     
-    def __init__(self, spi, dc, cs, rst=None, width=240, height=320):
+    # update_async/start_update accept a region (see DisplayManager)
+    partial_update = True
+    
+    def __init__(self, spi, dc, cs, rst=None, width=240, height=320, spi_id=None):
         """
         Initialize SPI display
         
@@ -127,6 +214,7 @@ class SPIDisplay:
             rst: Reset pin (optional)
             width: Display width
             height: Display height
+            spi_id: Hardware SPI id, enables DMA transfers on RP2040 (optional)
         """
         self.spi = spi
         self.dc = Pin(dc, Pin.OUT)
@@ -134,8 +222,14 @@ class SPIDisplay:
         self.rst = Pin(rst, Pin.OUT) if rst else None
         self.width = width
         self.height = height
+        self._cmd_buf = bytearray(1)
+        self._win_buf = bytearray(4)
+        self._dma_busy = False
+        self._dma_done = None
+        self._dma = self._init_dma(spi_id) if spi_id is not None else None
         
-        logger.info(f"SPI Display initialized ({width}x{height})")
+        logger.info(f"SPI Display initialized ({width}x{height}, "
+                    f"dma={self._dma is not None})")
         
         # Initialize display
         self._init_display()
@@ -152,9 +246,10 @@ class SPIDisplay:
     
     def _write_cmd(self, cmd):
         """Write command byte"""
+        self._cmd_buf[0] = cmd
         self.dc.value(0)
         self.cs.value(0)
-        self.spi.write(bytes([cmd]))
+        self.spi.write(self._cmd_buf)
         self.cs.value(1)
     
     def _write_data(self, data):
@@ -164,31 +259,155 @@ class SPIDisplay:
         self.spi.write(data)
         self.cs.value(1)
     
+    def _init_dma(self, spi_id):
+        """Claim a DMA channel paced by the SPI TX FIFO (RP2040 only)"""
+        # The register addresses and DREQ numbers below are the RP2040's;
+        # other chips (RP2350 included) keep the blocking spi.write path
+        if 'RP2040' not in getattr(sys.implementation, '_machine', ''):
+            return None
+        try:
+            import rp2
+            dma = rp2.DMA()
+        except (ImportError, AttributeError, OSError):
+            return None
+        
+        from machine import mem32
+        self._mem32 = mem32
+        self._dma_dst = _RP2_SPI_DR[spi_id]
+        self._spi_sr = _RP2_SPI_SR[spi_id]
+        
+        # End-of-transfer IRQ wakes wait_update_async; ports without
+        # ThreadSafeFlag poll the channel instead
+        flag = getattr(asyncio, 'ThreadSafeFlag', None)
+        if flag is not None:
+            self._dma_done = flag()
+            dma.irq(self._on_dma_done)
+        self._dma_ctrl = dma.pack_ctrl(size=0, inc_write=False,
+                                       treq_sel=_RP2_DREQ_SPI_TX[spi_id],
+                                       irq_quiet=flag is None)
+        return dma
+    
+    def _on_dma_done(self, dma):
+        """DMA end-of-transfer IRQ handler"""
+        self._dma_done.set()
+    
     def set_window(self, x0, y0, x1, y1):
-        """Set drawing window (implement for specific driver)"""
-        pass
+        """Set drawing window (inclusive) and start a memory write"""
+        cmd = self._cmd_buf
+        win = self._win_buf
+        spi = self.spi
+        dc = self.dc
+        self.cs.value(0)
+        
+        win[0] = x0 >> 8
+        win[1] = x0 & 0xFF
+        win[2] = x1 >> 8
+        win[3] = x1 & 0xFF
+        cmd[0] = LCD_CASET
+        dc.value(0)
+        spi.write(cmd)
+        dc.value(1)
+        spi.write(win)
+        
+        win[0] = y0 >> 8
+        win[1] = y0 & 0xFF
+        win[2] = y1 >> 8
+        win[3] = y1 & 0xFF
+        cmd[0] = LCD_RASET
+        dc.value(0)
+        spi.write(cmd)
+        dc.value(1)
+        spi.write(win)
+        
+        cmd[0] = LCD_RAMWR
+        dc.value(0)
+        spi.write(cmd)
+        self.cs.value(1)
     
     def write_pixels(self, data):
         """Write pixel data"""
         self._write_data(data)
     
-    async def update_async(self, framebuffer):
+    def start_update(self, framebuffer, rect=None):
+        """
+        Start sending a frame, or the part of it inside rect
+        
+        Runs of full-width rows are contiguous in the framebuffer and go out
+        as one transfer: with DMA this returns as soon as it is started, so
+        the caller can render the next frame into another buffer meanwhile.
+        Narrower regions are sent scanline by scanline and block.
+        
+        Args:
+            framebuffer: FrameBuffer object (RGB565)
+            rect: (x0, y0, x1, y1) inclusive region, whole screen if None
+        """
+        if rect is None:
+            x0, y0, x1, y1 = 0, 0, self.width - 1, self.height - 1
+        else:
+            x0, y0, x1, y1 = rect
+        self.set_window(x0, y0, x1, y1)
+        self.dc.value(1)
+        self.cs.value(0)
+        
+        stride = self.width * 2
+        buf = memoryview(framebuffer)
+        if x0 != 0 or x1 != self.width - 1:
+            start = y0 * stride + x0 * 2
+            end = start + (x1 - x0 + 1) * 2
+            for _ in range(y1 - y0 + 1):
+                self.spi.write(buf[start:end])
+                start += stride
+                end += stride
+            self.cs.value(1)
+            return
+        
+        span = buf[y0 * stride:(y1 + 1) * stride]
+        if self._dma is None:
+            self.spi.write(span)
+            self.cs.value(1)
+            return
+        
+        self._dma_busy = True
+        self._dma.config(read=span, write=self._dma_dst, count=len(span),
+                         ctrl=self._dma_ctrl, trigger=True)
+    
+    async def wait_update_async(self):
+        """Wait for the frame started by start_update to finish sending"""
+        if not self._dma_busy:
+            return
+        if self._dma_done is not None:
+            # Sleeps exactly until the end-of-transfer IRQ
+            await self._dma_done.wait()
+        else:
+            while self._dma.active():
+                await asyncio.sleep_ms(0)
+        # The DMA finishes once the last byte is in the TX FIFO: let the
+        # FIFO drain before deselecting the panel
+        mem32 = self._mem32
+        sr = self._spi_sr
+        while mem32[sr] & _RP2_SSPSR_BSY:
+            pass
+        self._dma_busy = False
+        self.cs.value(1)
+    
+    async def update_async(self, framebuffer, rect=None):
         """
         Async update display from framebuffer
         
         Args:
             framebuffer: FrameBuffer object
+            rect: (x0, y0, x1, y1) inclusive region, whole screen if None
         """
-        # Convert framebuffer to display format and write
-        # This is a placeholder - implement for specific display
         logger.debug("Display update")
-        await asyncio.sleep_ms(1)
+        self.start_update(framebuffer, rect)
+        await self.wait_update_async()
 
 
 class DisplayManager:
     """Manages display updates with async support"""
     
-    def __init__(self, display, framebuffer, fps=30):
+    def __init__(self, display, framebuffer, fps=30, back_framebuffer=None,
+                 bg_color=0):
         """
         Initialize display manager
         
@@ -196,18 +415,188 @@ class DisplayManager:
             display: Display driver object
             framebuffer: FrameBuffer object
             fps: Target frames per second
+            back_framebuffer: Second FrameBuffer to render into while the
+                first is being sent (optional, needs display.start_update)
+            bg_color: Framebuffer value run_frame_loop clears the dirty
+                area to before rendering (byte-swapped RGB565, see
+                Color.to_rgb565)
         """
         self.display = display
         self.framebuffer = framebuffer
+        self.front = framebuffer
+        self.back = back_framebuffer if back_framebuffer is not None else framebuffer
         self.fps = fps
         self.frame_time_ms = 1000 // fps
-        self.dirty = True
+        self.bg_color = bg_color
+        
+        # Screen size, 0 if the display doesn't report it (always full updates)
+        self.width = getattr(display, 'width', 0)
+        self.height = getattr(display, 'height', 0)
+        
+        # Resolved once; None for displays without async updates
+        self._display_update = getattr(display, 'update_async', None)
+        # Only drivers that declare it get update_async(fb, region); others
+        # keep the update_async(fb) signature and get full updates
+        self._partial_update = getattr(display, 'partial_update', False)
+        
+        # Dirty area as inclusive [x0, y0, x1, y1], empty while x0 > x1
+        self.dirty_rect = [0x7FFF, 0x7FFF, -1, -1]
+        # Areas mark_roots_dirty covered the last two frames, repainted
+        # again so windows that moved, shrank or closed leave nothing
+        # behind (two because a back buffer is a frame further behind)
+        self._last_roots_rect = [0x7FFF, 0x7FFF, -1, -1]
+        self._last2_roots_rect = [0x7FFF, 0x7FFF, -1, -1]
+        self.mark_dirty()
         
         logger.info(f"Display manager initialized (fps={fps})")
     
-    def mark_dirty(self):
-        """Mark display as needing update"""
-        self.dirty = True
+    @property
+    def dirty(self):
+        """True if anything needs to be sent to the display"""
+        return self.dirty_rect[0] <= self.dirty_rect[2]
+    
+    @dirty.setter
+    def dirty(self, value):
+        """True marks the whole screen, False drops any pending area"""
+        if value:
+            self.mark_dirty()
+        else:
+            d = self.dirty_rect
+            d[0] = d[1] = 0x7FFF
+            d[2] = d[3] = -1
+    
+    def sully(self, x, y):
+        """Widen the dirty area to include pixel (x, y)"""
+        d = self.dirty_rect
+        if x < d[0]:
+            d[0] = x
+        if y < d[1]:
+            d[1] = y
+        if x > d[2]:
+            d[2] = x
+        if y > d[3]:
+            d[3] = y
+    
+    def sully_rect(self, r):
+        """Widen the dirty area to include Rect r"""
+        if r.w > 0 and r.h > 0:
+            self.sully(r.x, r.y)
+            self.sully(r.x + r.w - 1, r.y + r.h - 1)
+    
+    def mark_dirty(self, rect=None):
+        """Mark display as needing update, only inside rect if given"""
+        if rect is None:
+            self.sully(0, 0)
+            self.sully(self.width - 1, self.height - 1)
+        else:
+            self.sully_rect(rect)
+    
+    def _take_dirty_region(self):
+        """Clamp the dirty area to the screen and reset it
+        
+        Returns:
+            (x0, y0, x1, y1) tuple, or None for the whole screen
+        """
+        d = self.dirty_rect
+        x0 = max(d[0], 0)
+        y0 = max(d[1], 0)
+        x1 = min(d[2], self.width - 1)
+        y1 = min(d[3], self.height - 1)
+        d[0] = d[1] = 0x7FFF
+        d[2] = d[3] = -1
+        
+        if x1 < x0 or y1 < y0:
+            # Screen size unknown (or dirty area off screen): send everything
+            return None
+        if x0 == 0 and y0 == 0 and x1 == self.width - 1 and y1 == self.height - 1:
+            return None
+        return (x0, y0, x1, y1)
+    
+    def mark_roots_dirty(self, ctx):
+        """Mark the root containers for update, plus the extent of any
+        command pushed outside them and everything those covered last frame"""
+        # Collect this frame's area on its own so it can be kept for the next
+        d = self.dirty_rect
+        x0, y0, x1, y1 = d
+        d[0] = d[1] = 0x7FFF
+        d[2] = d[3] = -1
+        
+        roots = ctx.root_list
+        heads = {}
+        for i in range(roots.idx):
+            cnt = roots.items[i]
+            self.sully_rect(cnt.rect)
+            heads[id(cnt.head)] = cnt.tail
+        # Root ranges are contiguous head..tail runs in the command list
+        tail = None
+        for cmd in ctx.command_list:
+            if tail is not None:
+                if cmd is tail:
+                    tail = None
+                continue
+            tail = heads.get(id(cmd))
+            if tail is None:
+                self._sully_command(cmd)
+        
+        last = self._last_roots_rect
+        last2 = self._last2_roots_rect
+        lx0, ly0, lx1, ly1 = last
+        if self.back is not self.front and last2[0] <= last2[2]:
+            self.sully(last2[0], last2[1])
+            self.sully(last2[2], last2[3])
+        last2[:] = last
+        last[:] = d
+        if lx0 <= lx1:
+            self.sully(lx0, ly0)
+            self.sully(lx1, ly1)
+        if x0 <= x1:
+            self.sully(x0, y0)
+            self.sully(x1, y1)
+    
+    def _sully_command(self, cmd):
+        """Widen the dirty area to cover one command drawn outside a root"""
+        t = cmd.type
+        if t == MU_COMMAND_NONE or t == MU_COMMAND_JUMP or t == MU_COMMAND_CLIP:
+            return
+        if t == MU_COMMAND_RECT or t == MU_COMMAND_BOX:
+            if cmd.w > 0 and cmd.h > 0:
+                self.sully(cmd.x, cmd.y)
+                self.sully(cmd.x + cmd.w - 1, cmd.y + cmd.h - 1)
+        elif t == MU_COMMAND_ICON:
+            self.sully_rect(cmd.rect)
+        elif hasattr(cmd, 'canvas_rect'):
+            self.sully_rect(cmd.canvas_rect)
+        else:
+            # Text and unknown commands: extent not tracked
+            self.mark_dirty()
+    
+    async def _present(self, ctx, clear=False):
+        """Render the current commands and send the dirty region, clearing
+        it to bg_color first if clear is set"""
+        region = self._take_dirty_region()
+        
+        # Render UI commands to the back buffer
+        fb = ctx.framebuffer = self.back
+        if clear:
+            if region is None:
+                fb.fill(self.bg_color)
+            else:
+                fb.fill_rect(region[0], region[1], region[2] - region[0] + 1,
+                             region[3] - region[1] + 1, self.bg_color)
+        render_commands(ctx)
+        
+        # Update display, only the dirty span when it is known
+        if self.back is not self.front:
+            # Double buffered: wait for the previous frame to leave,
+            # start this one and render the next into the other buffer
+            await self.display.wait_update_async()
+            self.display.start_update(self.back, region)
+            self.front, self.back = self.back, self.front
+        elif self._display_update is not None:
+            if region is None or not self._partial_update:
+                await self._display_update(self.framebuffer)
+            else:
+                await self._display_update(self.framebuffer, region)
     
     async def run_async(self, ctx):
         """
@@ -222,15 +611,41 @@ class DisplayManager:
             start = asyncio.ticks_ms()
             
             if self.dirty:
-                # Render UI commands to framebuffer
-                from .drawing import render_commands
-                render_commands(ctx)
-                
-                # Update display
-                if hasattr(self.display, 'update_async'):
-                    await self.display.update_async(self.framebuffer)
-                
-                self.dirty = False
+                await self._present(ctx)
+            
+            # Maintain frame rate
+            elapsed = asyncio.ticks_diff(asyncio.ticks_ms(), start)
+            delay = max(1, self.frame_time_ms - elapsed)
+            await asyncio.sleep_ms(delay)
+    
+    async def run_frame_loop(self, ctx, update_fn):
+        """
+        Single-task UI loop: build, render and send each frame in turn
+        
+        Replaces running ui_task alongside run_async, saving a task switch
+        and a sleep per frame. Touch polling stays a separate task.
+        
+        Each frame only the root containers, what is drawn outside them
+        and the area those covered the frame before are cleared to bg_color,
+        redrawn and sent, so windows that move, shrink or close leave
+        nothing behind.
+        
+        Args:
+            ctx: microui context
+            update_fn: Function that builds the UI each frame
+        """
+        logger.info("Starting frame loop")
+        
+        while True:
+            start = asyncio.ticks_ms()
+            
+            begin(ctx)
+            update_fn(ctx)
+            end(ctx)
+            self.mark_roots_dirty(ctx)
+            
+            if self.dirty:
+                await self._present(ctx, True)
             
             # Maintain frame rate
             elapsed = asyncio.ticks_diff(asyncio.ticks_ms(), start)
@@ -242,6 +657,10 @@ async def ui_task(ctx, display_mgr, update_fn):
     """
     Main UI task
     
+    Deprecated: use DisplayManager.run_frame_loop, which builds and renders
+    each frame in one task and only sends the areas that changed. This
+    task keeps marking the whole screen every frame.
+    
     Args:
         ctx: microui context
         display_mgr: DisplayManager instance
@@ -250,8 +669,6 @@ async def ui_task(ctx, display_mgr, update_fn):
     logger.info("Starting UI task")
     
     while True:
-        from .context import begin, end
-        
         # Begin frame
         begin(ctx)
         
@@ -268,6 +685,42 @@ async def ui_task(ctx, display_mgr, update_fn):
         await asyncio.sleep_ms(10)
 
 
+def _alloc_aligned(size, align=4):
+    """
+    Allocate a long-lived buffer whose start is aligned for DMA
+    
+    Collects first so the block comes from a defragmented heap, then
+    over-allocates and returns a memoryview starting at the first
+    aligned address (the view keeps the bytearray alive).
+    """
+    import gc
+    gc.collect()
+    raw = bytearray(size + align - 1)
+    try:
+        import uctypes
+        offset = -uctypes.addressof(raw) & (align - 1)
+    except ImportError:
+        offset = 0
+    return memoryview(raw)[offset:offset + size]
+
+
+def create_framebuffer(width, height):
+    """
+    Allocate an RGB565 framebuffer
+    
+    Args:
+        width: Width in pixels
+        height: Height in pixels
+    
+    Returns:
+        FrameBuffer object
+    """
+    import framebuf
+    
+    buffer = _alloc_aligned(width * height * 2)  # RGB565
+    return framebuf.FrameBuffer(buffer, width, height, framebuf.RGB565)
+
+
 def setup_hardware(i2c_params=None, spi_params=None, display_size=(240, 320)):
     """
     Setup hardware with default parameters
@@ -280,8 +733,6 @@ def setup_hardware(i2c_params=None, spi_params=None, display_size=(240, 320)):
     Returns:
         Tuple of (touch_screen, display, framebuffer)
     """
-    import framebuf
-    
     touch = None
     display = None
     
@@ -313,13 +764,12 @@ def setup_hardware(i2c_params=None, spi_params=None, display_size=(240, 320)):
             spi_params['cs'],
             spi_params.get('rst'),
             display_size[0],
-            display_size[1]
+            display_size[1],
+            spi_params.get('id', 1)
         )
     
     # Create framebuffer
-    buffer = bytearray(display_size[0] * display_size[1] * 2)  # RGB565
-    fb = framebuf.FrameBuffer(buffer, display_size[0], display_size[1], 
-                               framebuf.RGB565)
+    fb = create_framebuffer(display_size[0], display_size[1])
     
     logger.info("Hardware setup complete")
     return touch, display, fb
@@ -3,7 +3,9 @@
 Layout system for microui
 """
 import logging
-from .core import *
+from micropython import const
+from .core import (Rect, Vec2, Layout, MU_LAYOUTSTACK_SIZE, MU_MAX_WIDTHS,
+                   MU_LAYOUTRECTPOOL_SIZE)
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +19,9 @@ def push_layout(ctx, body, scroll):
     layout = Layout()
     layout.body = Rect(body.x - scroll.x, body.y - scroll.y, body.w, body.h)
     layout.max = Vec2(-0x1000000, -0x1000000)
-    ctx.layout_stack.push(layout)
+    if len(ctx.layout_stack) >= MU_LAYOUTSTACK_SIZE:
+        raise RuntimeError(f"Stack overflow (max: {MU_LAYOUTSTACK_SIZE})")
+    ctx.layout_stack.append(layout)
     
     width = 0
     layout_row(ctx, 1, [width], 0)
@@ -25,18 +29,20 @@ def push_layout(ctx, body, scroll):
 
 def get_layout(ctx):
     """Get current layout"""
-    return ctx.layout_stack.top()
+    return ctx.layout_stack[-1]
 
 
 def layout_row(ctx, items, widths, height):
     """Setup layout row"""
-    layout = get_layout(ctx)
+    layout = ctx.layout_stack[-1]
     
     if widths:
         if items > MU_MAX_WIDTHS:
             raise ValueError(f"Too many items: {items} (max {MU_MAX_WIDTHS})")
+        dst = layout.widths
+        n = len(widths)
         for i in range(items):
-            layout.widths[i] = widths[i] if i < len(widths) else 0
+            dst[i] = widths[i] if i < n else 0
     
     layout.items = items
     layout.position = Vec2(layout.indent, layout.next_row)
@@ -46,12 +52,12 @@ def layout_row(ctx, items, widths, height):
 
 def layout_width(ctx, width):
     """Set layout width"""
-    get_layout(ctx).size.x = width
+    ctx.layout_stack[-1].size.x = width
 
 
 def layout_height(ctx, height):
     """Set layout height"""
-    get_layout(ctx).size.y = height
+    ctx.layout_stack[-1].size.y = height
 
 
 def layout_begin_column(ctx):
@@ -61,11 +67,11 @@ def layout_begin_column(ctx):
 
 def layout_end_column(ctx):
     """End column layout"""
-    b = get_layout(ctx)
+    b = ctx.layout_stack[-1]
     ctx.layout_stack.pop()
     
     # Inherit position/next_row/max from child
-    a = get_layout(ctx)
+    a = ctx.layout_stack[-1]
     a.position.x = max(a.position.x, b.position.x + b.body.x - a.body.x)
     a.next_row = max(a.next_row, b.next_row + b.body.y - a.body.y)
     a.max.x = max(a.max.x, b.max.x)
@@ -74,16 +80,63 @@ def layout_end_column(ctx):
 
 def layout_set_next(ctx, r, relative):
     """Set next layout rect"""
-    layout = get_layout(ctx)
+    layout = ctx.layout_stack[-1]
     layout.next = r
     layout.next_type = RELATIVE if relative else ABSOLUTE
 
 
 def layout_next(ctx):
-    """Get next layout rect"""
-    layout = get_layout(ctx)
-    style = ctx.style
+    """Get next layout rect
     
+    The returned Rect, also left in ctx.last_rect, comes from a ring of
+    MU_LAYOUTRECTPOOL_SIZE (32) rects on the context and is overwritten
+    by the 32nd layout_next call after it: copy it to keep it longer.
+    Rects given to layout_set_next are returned as they are.
+    """
+    layout = ctx.layout_stack[-1]
+    
+    # Fast path: next item of the current row with fixed positive size
+    idx = layout.item_index
+    if layout.next_type or idx >= layout.items:
+        return _layout_next_slow(ctx, layout)
+    w = layout.widths[idx]
+    h = layout.size.y
+    if w <= 0 or h <= 0:
+        return _layout_next_slow(ctx, layout)
+    
+    layout.item_index = idx + 1
+    spacing = ctx._spacing
+    pos = layout.position
+    x = pos.x
+    y = pos.y
+    pos.x = x + w + spacing
+    bottom = y + h + spacing
+    if bottom > layout.next_row:
+        layout.next_row = bottom
+    
+    body = layout.body
+    x += body.x
+    y += body.y
+    
+    mx = layout.max
+    if x + w > mx.x:
+        mx.x = x + w
+    if y + h > mx.y:
+        mx.y = y + h
+    
+    i = ctx._rect_i
+    ctx._rect_i = (i + 1) & (MU_LAYOUTRECTPOOL_SIZE - 1)
+    res = ctx._rect_pool[i]
+    res.x = x
+    res.y = y
+    res.w = w
+    res.h = h
+    ctx.last_rect = res
+    return res
+
+
+def _layout_next_slow(ctx, layout):
+    """layout_next for set_next rects, new rows and auto/fill sizes"""
     if layout.next_type:
         # Handle rect set by layout_set_next
         type_val = layout.next_type
@@ -92,46 +145,67 @@ def layout_next(ctx):
         if type_val == ABSOLUTE:
             ctx.last_rect = res
             return res
+        x = res.x
+        y = res.y
+        w = res.w
+        h = res.h
     else:
         # Handle next row
         if layout.item_index == layout.items:
             layout_row(ctx, layout.items, None, layout.size.y)
         
         # Position
-        res = Rect()
-        res.x = layout.position.x
-        res.y = layout.position.y
+        pos = layout.position
+        x = pos.x
+        y = pos.y
         
         # Size
-        if layout.items > 0:
-            res.w = layout.widths[layout.item_index]
-        else:
-            res.w = layout.size.x
+        size = layout.size
+        idx = layout.item_index
+        w = layout.widths[idx] if layout.items > 0 else size.x
+        h = size.y
         
-        res.h = layout.size.y
+        if w == 0:
+            w = ctx.style._def_w
+        if h == 0:
+            h = ctx.style._def_h
+        if w < 0:
+            w += layout.body.w - x + 1
+        if h < 0:
+            h += layout.body.h - y + 1
         
-        if res.w == 0:
-            res.w = style.size.x + style.padding * 2
-        if res.h == 0:
-            res.h = style.size.y + style.padding * 2
-        if res.w < 0:
-            res.w += layout.body.w - res.x + 1
-        if res.h < 0:
-            res.h += layout.body.h - res.y + 1
-        
-        layout.item_index += 1
+        layout.item_index = idx + 1
+        res = None
     
     # Update position
-    layout.position.x += res.w + style.spacing
-    layout.next_row = max(layout.next_row, res.y + res.h + style.spacing)
+    spacing = ctx._spacing
+    layout.position.x += w + spacing
+    bottom = y + h + spacing
+    if bottom > layout.next_row:
+        layout.next_row = bottom
     
     # Apply body offset
-    res.x += layout.body.x
-    res.y += layout.body.y
+    body = layout.body
+    x += body.x
+    y += body.y
     
     # Update max position
-    layout.max.x = max(layout.max.x, res.x + res.w)
-    layout.max.y = max(layout.max.y, res.y + res.h)
+    mx = layout.max
+    if x + w > mx.x:
+        mx.x = x + w
+    if y + h > mx.y:
+        mx.y = y + h
     
+    if res is None:
+        i = ctx._rect_i
+        ctx._rect_i = (i + 1) & (MU_LAYOUTRECTPOOL_SIZE - 1)
+        res = ctx._rect_pool[i]
+        res.x = x
+        res.y = y
+        res.w = w
+        res.h = h
+    else:
+        res.x = x
+        res.y = y
     ctx.last_rect = res
     return res
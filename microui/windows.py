@@ -3,12 +3,17 @@
 Window and panel management for microui
 """
 import logging
-from .core import *
+from .core import (Rect, Vec2, clamp, expand_rect, rect_overlaps_vec2,
+                   MU_CLIPSTACK_SIZE, MU_MOUSE_LEFT, MU_ICON_CLOSE,
+                   MU_COLOR_WINDOWBG, MU_COLOR_PANELBG, MU_COLOR_TITLEBG,
+                   MU_COLOR_TITLETEXT, MU_COLOR_SCROLLBASE, MU_COLOR_SCROLLTHUMB,
+                   MU_OPT_NOFRAME, MU_OPT_NOTITLE, MU_OPT_NOCLOSE, MU_OPT_NORESIZE,
+                   MU_OPT_NOSCROLL, MU_OPT_AUTOSIZE, MU_OPT_POPUP, MU_OPT_CLOSED)
 from .context import (get_id, push_id, pop_id, get_current_container, 
                      _get_container, bring_to_front, push_clip_rect, 
                      pop_clip_rect, set_focus)
 from .drawing import draw_frame, draw_icon, push_jump
-from .layout import push_layout, get_layout, expand_rect, layout_next
+from .layout import push_layout, layout_next
 
 logger = logging.getLogger(__name__)
 
@@ -18,16 +23,17 @@ def push_container_body(ctx, cnt, body, opt):
     if not (opt & MU_OPT_NOSCROLL):
         _scrollbars(ctx, cnt, body)
     
-    push_layout(ctx, expand_rect(body, -ctx.style.padding), cnt.scroll)
+    push_layout(ctx, expand_rect(body, -ctx._padding), cnt.scroll)
     cnt.body = body
 
 
 def _scrollbars(ctx, cnt, body):
     """Add scrollbars to container"""
-    sz = ctx.style.scrollbar_size
+    sz = ctx._scrollbar_size
     cs = Vec2(cnt.content_size.x, cnt.content_size.y)
-    cs.x += ctx.style.padding * 2
-    cs.y += ctx.style.padding * 2
+    pad2 = ctx.style._pad2
+    cs.x += pad2
+    cs.y += pad2
     
     push_clip_rect(ctx, body)
     
@@ -37,72 +43,72 @@ def _scrollbars(ctx, cnt, body):
     if cs.x > cnt.body.w:
         body.h -= sz
     
-    # Vertical scrollbar
-    _scrollbar(ctx, cnt, body, cs, True)
-    # Horizontal scrollbar
-    _scrollbar(ctx, cnt, body, cs, False)
+    # Only set up the scrollbars that have something to scroll
+    maxscroll = cs.y - body.h
+    if maxscroll > 0 and body.h > 0:
+        _scrollbar(ctx, cnt, body, cs, maxscroll, True)
+    else:
+        cnt.scroll.y = 0
+    maxscroll = cs.x - body.w
+    if maxscroll > 0 and body.w > 0:
+        _scrollbar(ctx, cnt, body, cs, maxscroll, False)
+    else:
+        cnt.scroll.x = 0
     
     pop_clip_rect(ctx)
 
 
-def _scrollbar(ctx, cnt, body, cs, vertical):
-    """Draw scrollbar"""
+def _scrollbar(ctx, cnt, body, cs, maxscroll, vertical):
+    """Draw scrollbar (maxscroll > 0, checked by _scrollbars)"""
     from .controls import update_control, mouse_over
     
+    scroll = cnt.scroll
+    bx = body.x
+    by = body.y
+    bw = body.w
+    bh = body.h
+    
     if vertical:
-        maxscroll = cs.y - body.h
-        if maxscroll <= 0 or body.h <= 0:
-            cnt.scroll.y = 0
-            return
-        
         id_val = get_id(ctx, "!scrollbary")
         
-        base = Rect(body.x + body.w, body.y, ctx.style.scrollbar_size, body.h)
+        base = Rect(bx + bw, by, ctx._scrollbar_size, bh)
         
         update_control(ctx, id_val, base, 0)
         
         if ctx.focus == id_val and ctx.mouse_down == MU_MOUSE_LEFT:
-            cnt.scroll.y += ctx.mouse_delta.y * cs.y / base.h
+            scroll.y += int(ctx.mouse_delta.y * cs.y / bh)
         
-        cnt.scroll.y = clamp(cnt.scroll.y, 0, maxscroll)
+        scroll.y = clamp(scroll.y, 0, maxscroll)
         
         draw_frame(ctx, base, MU_COLOR_SCROLLBASE)
         
-        thumb = Rect(base.x, base.y, base.w, 
-                    max(ctx.style.thumb_size, base.h * body.h // cs.y))
-        thumb.y += int(cnt.scroll.y * (base.h - thumb.h) / maxscroll) if maxscroll else 0
+        thumb = Rect(base.x, by, base.w, 
+                    max(ctx.style.thumb_size, bh * bh // cs.y))
+        thumb.y += int(scroll.y * (bh - thumb.h) / maxscroll)
         
         draw_frame(ctx, thumb, MU_COLOR_SCROLLTHUMB)
-        
-        if mouse_over(ctx, body):
-            ctx.scroll_target = cnt
     else:
-        maxscroll = cs.x - body.w
-        if maxscroll <= 0 or body.w <= 0:
-            cnt.scroll.x = 0
-            return
-        
         id_val = get_id(ctx, "!scrollbarx")
         
-        base = Rect(body.x, body.y + body.h, body.w, ctx.style.scrollbar_size)
+        base = Rect(bx, by + bh, bw, ctx._scrollbar_size)
         
         update_control(ctx, id_val, base, 0)
         
         if ctx.focus == id_val and ctx.mouse_down == MU_MOUSE_LEFT:
-            cnt.scroll.x += ctx.mouse_delta.x * cs.x / base.w
+            scroll.x += int(ctx.mouse_delta.x * cs.x / bw)
         
-        cnt.scroll.x = clamp(cnt.scroll.x, 0, maxscroll)
+        scroll.x = clamp(scroll.x, 0, maxscroll)
         
         draw_frame(ctx, base, MU_COLOR_SCROLLBASE)
         
-        thumb = Rect(base.x, base.y, 
-                    max(ctx.style.thumb_size, base.w * body.w // cs.x), base.h)
-        thumb.x += int(cnt.scroll.x * (base.w - thumb.w) / maxscroll) if maxscroll else 0
+        thumb = Rect(bx, base.y, 
+                    max(ctx.style.thumb_size, bw * bw // cs.x), base.h)
+        thumb.x += int(scroll.x * (bw - thumb.w) / maxscroll)
         
         draw_frame(ctx, thumb, MU_COLOR_SCROLLTHUMB)
-        
-        if mouse_over(ctx, body):
-            ctx.scroll_target = cnt
+    
+    if mouse_over(ctx, body):
+        ctx.scroll_target = cnt
 
 
 def begin_root_container(ctx, cnt):
@@ -119,7 +125,9 @@ def begin_root_container(ctx, cnt):
         ctx.next_hover_root = cnt
     
     # Reset clipping
-    ctx.clip_stack.push(ctx.unclipped_rect)
+    if len(ctx.clip_stack) >= MU_CLIPSTACK_SIZE:
+        raise RuntimeError(f"Stack overflow (max: {MU_CLIPSTACK_SIZE})")
+    ctx.clip_stack.append(ctx.unclipped_rect)
 
 
 def end_root_container(ctx):
@@ -135,7 +143,7 @@ def end_root_container(ctx):
 def _pop_container(ctx):
     """Pop container from stack"""
     cnt = get_current_container(ctx)
-    layout = get_layout(ctx)
+    layout = ctx.layout_stack[-1]
     
     cnt.content_size.x = layout.max.x - layout.body.x
     cnt.content_size.y = layout.max.y - layout.body.y
@@ -158,6 +166,13 @@ def begin_window_ex(ctx, title, rect, opt):
     if cnt.rect.w == 0:
         cnt.rect = rect
     
+    # Decode options once
+    no_title = opt & MU_OPT_NOTITLE
+    no_resize = opt & MU_OPT_NORESIZE
+    title_h = ctx._title_height
+    if not (no_title and no_resize):
+        from .controls import update_control, draw_control_text
+    
     begin_root_container(ctx, cnt)
     rect = cnt.rect
     body = Rect(rect.x, rect.y, rect.w, rect.h)
@@ -167,10 +182,8 @@ def begin_window_ex(ctx, title, rect, opt):
         draw_frame(ctx, rect, MU_COLOR_WINDOWBG)
     
     # Do title bar
-    if not (opt & MU_OPT_NOTITLE):
-        from .controls import update_control, draw_control_text
-        
-        tr = Rect(rect.x, rect.y, rect.w, ctx.style.title_height)
+    if not no_title:
+        tr = Rect(rect.x, rect.y, rect.w, title_h)
         draw_frame(ctx, tr, MU_COLOR_TITLEBG)
         
         # Title text
@@ -179,17 +192,17 @@ def begin_window_ex(ctx, title, rect, opt):
         draw_control_text(ctx, title, tr, MU_COLOR_TITLETEXT, opt)
         
         if title_id == ctx.focus and ctx.mouse_down == MU_MOUSE_LEFT:
-            cnt.rect.x += ctx.mouse_delta.x
-            cnt.rect.y += ctx.mouse_delta.y
+            rect.x += ctx.mouse_delta.x
+            rect.y += ctx.mouse_delta.y
         
-        body.y += tr.h
-        body.h -= tr.h
+        body.y += title_h
+        body.h -= title_h
         
         # Close button
         if not (opt & MU_OPT_NOCLOSE):
             close_id = get_id(ctx, "!close")
-            r = Rect(tr.x + tr.w - tr.h, tr.y, tr.h, tr.h)
-            tr.w -= r.w
+            r = Rect(tr.x + tr.w - title_h, tr.y, title_h, title_h)
+            tr.w -= title_h
             
             draw_icon(ctx, MU_ICON_CLOSE, r, ctx.style.colors[MU_COLOR_TITLETEXT])
             update_control(ctx, close_id, r, opt)
@@ -200,28 +213,27 @@ def begin_window_ex(ctx, title, rect, opt):
     push_container_body(ctx, cnt, body, opt)
     
     # Resize handle
-    if not (opt & MU_OPT_NORESIZE):
-        from .controls import update_control
-        
-        sz = ctx.style.title_height
+    if not no_resize:
         resize_id = get_id(ctx, "!resize")
-        r = Rect(rect.x + rect.w - sz, rect.y + rect.h - sz, sz, sz)
+        r = Rect(rect.x + rect.w - title_h, rect.y + rect.h - title_h,
+                 title_h, title_h)
         
         update_control(ctx, resize_id, r, opt)
         
         if resize_id == ctx.focus and ctx.mouse_down == MU_MOUSE_LEFT:
-            cnt.rect.w = max(96, cnt.rect.w + ctx.mouse_delta.x)
-            cnt.rect.h = max(64, cnt.rect.h + ctx.mouse_delta.y)
+            rect.w = max(96, rect.w + ctx.mouse_delta.x)
+            rect.h = max(64, rect.h + ctx.mouse_delta.y)
     
     # Auto size
     if opt & MU_OPT_AUTOSIZE:
-        r = get_layout(ctx).body
-        cnt.rect.w = cnt.content_size.x + (cnt.rect.w - r.w)
-        cnt.rect.h = cnt.content_size.y + (cnt.rect.h - r.h)
+        r = ctx.layout_stack[-1].body
+        rect.w = cnt.content_size.x + (rect.w - r.w)
+        rect.h = cnt.content_size.y + (rect.h - r.h)
     
     # Close popup if clicked elsewhere
-    if opt & MU_OPT_POPUP and ctx.mouse_pressed and ctx.hover_root != cnt:
-        cnt.open = 0
+    if opt & MU_OPT_POPUP:
+        if ctx.mouse_pressed and ctx.hover_root != cnt:
+            cnt.open = 0
     
     push_clip_rect(ctx, cnt.body)
     return True
@@ -265,7 +277,8 @@ def begin_panel_ex(ctx, name, opt):
     """Begin panel"""
     push_id(ctx, name)
     cnt = _get_container(ctx, ctx.last_id, opt)
-    cnt.rect = layout_next(ctx)
+    r = layout_next(ctx)
+    cnt.rect = Rect(r.x, r.y, r.w, r.h)  # layout rects are pooled
     
     if not (opt & MU_OPT_NOFRAME):
         draw_frame(ctx, cnt.rect, MU_COLOR_PANELBG)
@@ -19,6 +19,19 @@ def mock_text_height(font):
     return 10
 
 
+class FramebufferTestCase(unittest.TestCase):
+    """Shares one 240x320 RGB565 framebuffer across a class's tests"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.buffer = bytearray(240 * 320 * 2)
+        cls.fb = framebuf.FrameBuffer(cls.buffer, 240, 320, framebuf.RGB565)
+    
+    def setUp(self):
+        """Clear the shared framebuffer"""
+        self.fb.fill(0)
+
+
 class TestCore(unittest.TestCase):
     """Test core data structures"""
     
@@ -48,6 +61,31 @@ class TestCore(unittest.TestCase):
         rgb565 = c.to_rgb565()
         self.assertIsInstance(rgb565, int)
     
+    def test_rgb565_table(self):
+        """Test table-based RGB565 packing against the arithmetic form"""
+        from microui.core import pack_rgb565
+        
+        def ref(r, g, b):
+            x = ((r & 0xF8) << 8) | ((g & 0xFC) << 3) | (b >> 3)
+            return ((x & 0xFF) << 8) | ((x >> 8) & 0xFF)
+        
+        for v in range(256):
+            self.assertEqual(pack_rgb565(v, 0, 0), ref(v, 0, 0))
+            self.assertEqual(pack_rgb565(0, v, 0), ref(0, v, 0))
+            self.assertEqual(pack_rgb565(0, 0, v), ref(0, 0, v))
+            self.assertEqual(pack_rgb565(v, 255 - v, v ^ 0x5A),
+                             ref(v, 255 - v, v ^ 0x5A))
+        self.assertEqual(pack_rgb565(255, 255, 255), 0xFFFF)
+        self.assertEqual(pack_rgb565(0, 0, 0), 0)
+        
+        # Out of range channels wrap to their low byte instead of raising
+        from microui.core import Color
+        for r, g, b in ((256, 0, 0), (0, 300, 0), (0, 0, 511), (-1, -8, -255)):
+            self.assertEqual(pack_rgb565(r, g, b),
+                             ref(r & 0xFF, g & 0xFF, b & 0xFF))
+            self.assertEqual(Color(r, g, b)._rgb565,
+                             ref(r & 0xFF, g & 0xFF, b & 0xFF))
+    
     def test_stack(self):
         from microui.core import Stack
         s = Stack(10)
@@ -73,7 +111,8 @@ class TestCore(unittest.TestCase):
             s.push(3)
     
     def test_util_functions(self):
-        from microui.core import clamp, expand_rect, intersect_rects, Rect
+        from microui.core import (clamp, expand_rect, intersect_rects,
+                                  rects_overlap, Rect)
         
         # Test clamp
         self.assertEqual(clamp(5, 0, 10), 5)
@@ -95,19 +134,22 @@ class TestCore(unittest.TestCase):
         self.assertEqual(r3.y, 50)
         self.assertEqual(r3.w, 50)
         self.assertEqual(r3.h, 50)
+        
+        # Test rects_overlap
+        self.assertTrue(rects_overlap(r1, r2))
+        self.assertFalse(rects_overlap(r1, Rect(100, 0, 10, 10)))
+        self.assertFalse(rects_overlap(r1, Rect(0, 200, 10, 10)))
 
 
-class TestContext(unittest.TestCase):
+class TestContext(FramebufferTestCase):
     """Test context functionality"""
     
     def setUp(self):
         """Setup test context"""
         from microui.core import Context
         
-        buffer = bytearray(240 * 320 * 2)
-        fb = framebuf.FrameBuffer(buffer, 240, 320, framebuf.RGB565)
-        
-        self.ctx = Context(mock_text_width, mock_text_height, fb)
+        super().setUp()
+        self.ctx = Context(mock_text_width, mock_text_height, self.fb)
     
     def test_context_init(self):
         """Test context initialization"""
@@ -152,6 +194,39 @@ class TestContext(unittest.TestCase):
         
         self.assertNotEqual(id2, id3)
     
+    def test_id_cache(self):
+        """Test cached string ids match freshly hashed ones"""
+        from microui.core import hash_data, HASH_INITIAL
+        from microui.context import push_id, pop_id, get_id
+        
+        name = "window"
+        id1 = get_id(self.ctx, name)
+        id2 = get_id(self.ctx, name)
+        id3 = get_id(self.ctx, "".join(["win", "dow"]))
+        self.assertEqual(id1, id2)
+        self.assertEqual(id1, id3)
+        self.assertEqual(id1, hash_data(HASH_INITIAL, name))
+        
+        push_id(self.ctx, "nested")
+        self.assertNotEqual(get_id(self.ctx, name), id1)
+        pop_id(self.ctx)
+    
+    def test_slider_id_not_cached(self):
+        """Test per-frame slider keys stay out of the string id cache"""
+        from microui.context import begin, get_id, get_id_uncached
+        from microui.controls import slider
+        from microui.layout import push_layout
+        from microui.core import Rect, Vec2
+        
+        begin(self.ctx)
+        push_layout(self.ctx, Rect(0, 0, 240, 320), Vec2(0, 0))
+        get_id(self.ctx, "window")
+        for i in range(100):
+            slider(self.ctx, 50.0 + i, 0.0, 200.0)
+        self.assertEqual(len(self.ctx._id_cache), 1)
+        self.assertEqual(get_id_uncached(self.ctx, "window"),
+                         get_id(self.ctx, "window"))
+    
     def test_clip_rect(self):
         """Test clip rectangle"""
         from microui.context import begin, push_clip_rect, pop_clip_rect, get_clip_rect
@@ -185,7 +260,7 @@ class TestContext(unittest.TestCase):
         self.assertEqual(self.ctx.mouse_down, 0)
 
 
-class TestLayout(unittest.TestCase):
+class TestLayout(FramebufferTestCase):
     """Test layout system"""
     
     def setUp(self):
@@ -193,10 +268,8 @@ class TestLayout(unittest.TestCase):
         from microui.core import Context, Rect
         from microui.context import begin
         
-        buffer = bytearray(240 * 320 * 2)
-        fb = framebuf.FrameBuffer(buffer, 240, 320, framebuf.RGB565)
-        
-        self.ctx = Context(mock_text_width, mock_text_height, fb)
+        super().setUp()
+        self.ctx = Context(mock_text_width, mock_text_height, self.fb)
         begin(self.ctx)
         
         # Push initial clip rect
@@ -235,9 +308,72 @@ class TestLayout(unittest.TestCase):
         
         r2 = layout_next(self.ctx)
         self.assertGreater(r2.x, r1.x)
+    
+    def test_layout_fast_path_matches_slow(self):
+        """Test layout_next's fast path gives the same rects as the slow one"""
+        from microui.layout import (push_layout, layout_row, layout_next,
+                                    layout_set_next, get_layout,
+                                    _layout_next_slow)
+        from microui.core import Context, Rect, Vec2
+        from microui.context import begin, push_clip_rect
+        
+        rows = [
+            (3, [50, 60, 40], 20),     # fixed sizes: fast path
+            (3, [50, 0, -1], 20),      # default and fill widths
+            (2, [30, 30], 0),          # default height
+            (2, [-10, 40], -5),        # negative width and height
+            (1, [70], 15),
+        ]
+        
+        def run(ctx, next_fn):
+            push_layout(ctx, Rect(10, 20, 200, 300), Vec2(0, 0))
+            out = []
+            for items, widths, height in rows:
+                layout_row(ctx, items, widths, height)
+                for _ in range(items * 2):  # wraps onto a second row
+                    r = next_fn(ctx)
+                    out.append((r.x, r.y, r.w, r.h))
+            # With next_type set, then unset again
+            layout_set_next(ctx, Rect(5, 5, 20, 10), True)
+            r = next_fn(ctx)
+            out.append((r.x, r.y, r.w, r.h))
+            r = next_fn(ctx)
+            out.append((r.x, r.y, r.w, r.h))
+            layout = get_layout(ctx)
+            out.append((layout.position.x, layout.position.y, layout.next_row,
+                        layout.max.x, layout.max.y))
+            return out
+        
+        def slow(ctx):
+            return _layout_next_slow(ctx, get_layout(ctx))
+        
+        other = Context(mock_text_width, mock_text_height, self.fb)
+        begin(other)
+        push_clip_rect(other, Rect(0, 0, 240, 320))
+        
+        self.assertEqual(run(self.ctx, layout_next), run(other, slow))
+    
+    def test_layout_rect_pool(self):
+        """Test a kept layout rect is overwritten after a full pool cycle"""
+        from microui.layout import push_layout, layout_row, layout_next
+        from microui.core import Rect, Vec2, MU_LAYOUTRECTPOOL_SIZE
+        
+        push_layout(self.ctx, Rect(0, 0, 200, 300), Vec2(0, 0))
+        layout_row(self.ctx, 1, [100], 5)
+        
+        kept = layout_next(self.ctx)
+        self.assertIs(self.ctx.last_rect, kept)
+        y = kept.y
+        for _ in range(MU_LAYOUTRECTPOOL_SIZE - 1):
+            self.assertIsNot(layout_next(self.ctx), kept)
+        self.assertEqual(kept.y, y)
+        
+        # The 33rd call reuses it
+        self.assertIs(layout_next(self.ctx), kept)
+        self.assertNotEqual(kept.y, y)
 
 
-class TestControls(unittest.TestCase):
+class TestControls(FramebufferTestCase):
     """Test UI controls"""
     
     def setUp(self):
@@ -245,10 +381,8 @@ class TestControls(unittest.TestCase):
         from microui.core import Context, Rect
         from microui.context import begin
         
-        buffer = bytearray(240 * 320 * 2)
-        fb = framebuf.FrameBuffer(buffer, 240, 320, framebuf.RGB565)
-        
-        self.ctx = Context(mock_text_width, mock_text_height, fb)
+        super().setUp()
+        self.ctx = Context(mock_text_width, mock_text_height, self.fb)
         begin(self.ctx)
         
         # Setup initial layout
@@ -293,6 +427,16 @@ class TestControls(unittest.TestCase):
         self.assertEqual(res, 0)
         self.assertEqual(new_state, False)
     
+    def test_checkbox_unhashable_state(self):
+        """Test a checkbox whose state is a list"""
+        from microui.controls import checkbox
+        
+        state = [True]
+        res, new_state = checkbox(self.ctx, "x", state)
+        
+        self.assertEqual(res, 0)
+        self.assertIs(new_state, state)
+    
     def test_slider(self):
         """Test slider control"""
         from microui.controls import slider
@@ -318,7 +462,7 @@ class TestControls(unittest.TestCase):
         text(self.ctx, "Multi-line text that should wrap properly")
 
 
-class TestWindows(unittest.TestCase):
+class TestWindows(FramebufferTestCase):
     """Test window management"""
     
     def setUp(self):
@@ -326,10 +470,8 @@ class TestWindows(unittest.TestCase):
         from microui.core import Context
         from microui.context import begin
         
-        buffer = bytearray(240 * 320 * 2)
-        fb = framebuf.FrameBuffer(buffer, 240, 320, framebuf.RGB565)
-        
-        self.ctx = Context(mock_text_width, mock_text_height, fb)
+        super().setUp()
+        self.ctx = Context(mock_text_width, mock_text_height, self.fb)
         begin(self.ctx)
     
     def test_window_begin_end(self):
@@ -355,19 +497,43 @@ class TestWindows(unittest.TestCase):
         end_panel(self.ctx)
         
         end_window(self.ctx)
+    
+    def test_pooled_rect_copies(self):
+        """Test panels and canvases keep their own copy of the layout rect"""
+        from microui.windows import begin_window, end_window, begin_panel, end_panel
+        from microui.context import get_current_container
+        from microui.controls import canvas
+        from microui.core import Rect, MU_LAYOUTRECTPOOL_SIZE
+        from microui.layout import layout_row, layout_next
+        
+        begin_window(self.ctx, "Window", Rect(10, 10, 200, 300))
+        
+        layout_row(self.ctx, 1, [-1], 50)
+        begin_panel(self.ctx, "Panel")
+        panel_rect = get_current_container(self.ctx).rect
+        end_panel(self.ctx)
+        cv = canvas(self.ctx, 100, 40)
+        
+        for r in (panel_rect, cv.rect):
+            self.assertFalse(any(r is p for p in self.ctx._rect_pool))
+        expected = [(r.x, r.y, r.w, r.h) for r in (panel_rect, cv.rect)]
+        for _ in range(MU_LAYOUTRECTPOOL_SIZE + 1):
+            layout_next(self.ctx)
+        self.assertEqual([(r.x, r.y, r.w, r.h) for r in (panel_rect, cv.rect)],
+                         expected)
+        
+        end_window(self.ctx)
 
 
-class TestDrawing(unittest.TestCase):
+class TestDrawing(FramebufferTestCase):
     """Test drawing functions"""
     
     def setUp(self):
         """Setup test context"""
         from microui.core import Context
         
-        buffer = bytearray(240 * 320 * 2)
-        fb = framebuf.FrameBuffer(buffer, 240, 320, framebuf.RGB565)
-        
-        self.ctx = Context(mock_text_width, mock_text_height, fb)
+        super().setUp()
+        self.ctx = Context(mock_text_width, mock_text_height, self.fb)
     
     def test_draw_rect(self):
         """Test rectangle drawing"""
@@ -383,6 +549,68 @@ class TestDrawing(unittest.TestCase):
         # Check command was added
         self.assertGreater(len(self.ctx.command_list), 0)
     
+    def test_shared_framebuffer_cleared(self):
+        """Test each test starts from a cleared framebuffer record"""
+        self.assertEqual(self.fb.operations, [('fill', 0)])
+        self.fb.fill_rect(0, 0, 10, 10, 0xFFFF)
+        self.fb.fill(0)
+        self.assertEqual(self.fb.operations, [('fill', 0)])
+    
+    def test_draw_rect_float(self):
+        """Test rectangle drawing with float coordinates"""
+        from microui.drawing import draw_rect, draw_box
+        from microui.core import Rect, Color
+        from microui.context import begin, push_clip_rect
+        
+        begin(self.ctx)
+        push_clip_rect(self.ctx, Rect(0, 0, 240, 320))
+        
+        draw_rect(self.ctx, Rect(10.5, 10.2, 50.7, 30.0), Color(255, 0, 0))
+        draw_box(self.ctx, Rect(10.5, 10.2, 50.7, 30.0), Color(255, 0, 0))
+        
+        cmd = self.ctx.command_list[-2]
+        self.assertEqual((cmd.x, cmd.y, cmd.w, cmd.h), (10, 10, 50, 30))
+        cmd = self.ctx.command_list[-1]
+        self.assertEqual((cmd.x, cmd.y, cmd.w, cmd.h), (10, 10, 50, 30))
+    
+    def test_float_window_rect(self):
+        """Test a window and frame built from float coordinates"""
+        from microui.windows import begin_window, end_window
+        from microui.drawing import draw_frame
+        from microui.core import Rect, MU_COLOR_BUTTON
+        from microui.context import begin, end
+        from microui.controls import label
+        
+        begin(self.ctx)
+        if begin_window(self.ctx, "w", Rect(10.5, 10, 200, 100)):
+            label(self.ctx, "float")
+            draw_frame(self.ctx, Rect(1.5, 2, 10, 10), MU_COLOR_BUTTON)
+            end_window(self.ctx)
+        end(self.ctx)
+        
+        for cmd in self.ctx.command_list:
+            for attr in ('x', 'y', 'w', 'h'):
+                if hasattr(cmd, attr):
+                    self.assertIsInstance(getattr(cmd, attr), int)
+    
+    def test_float_row_widths(self):
+        """Test a layout row with float widths"""
+        from microui.windows import begin_window, end_window
+        from microui.layout import layout_row
+        from microui.core import Rect
+        from microui.context import begin, end
+        from microui.controls import button
+        
+        begin(self.ctx)
+        if begin_window(self.ctx, "w", Rect(10, 10, 200, 100)):
+            layout_row(self.ctx, 2, [200 / 3, -1], 0)
+            button(self.ctx, "a")
+            button(self.ctx, "b")
+            end_window(self.ctx)
+        end(self.ctx)
+        
+        self.assertGreater(len(self.ctx.command_list), 0)
+    
     def test_draw_text(self):
         """Test text drawing"""
         from microui.drawing import draw_text
@@ -411,20 +639,56 @@ class TestDrawing(unittest.TestCase):
         
         # Should not raise exception
         render_commands(self.ctx)
+    
+    def test_merge_adjacent_rects(self):
+        """Test adjacent same-colored rects are merged at end of frame"""
+        from microui.drawing import draw_rect
+        from microui.core import Rect, Color, MU_COMMAND_RECT, MU_COMMAND_NONE
+        from microui.context import begin, end
+        
+        begin(self.ctx)
+        
+        red = Color(255, 0, 0)
+        draw_rect(self.ctx, Rect(10, 10, 20, 5), red)
+        draw_rect(self.ctx, Rect(30, 10, 20, 5), red)
+        draw_rect(self.ctx, Rect(50, 10, 20, 5), Color(0, 255, 0))
+        
+        end(self.ctx)
+        
+        types = [cmd.type for cmd in self.ctx.command_list]
+        self.assertEqual(types, [MU_COMMAND_RECT, MU_COMMAND_NONE, MU_COMMAND_RECT])
+        self.assertEqual(self.ctx.command_list[0].w, 40)
+    
+    def test_merge_keeps_distinct_rgba(self):
+        """Test rects with equal RGB565 but different RGBA are not merged"""
+        from microui.drawing import draw_rect
+        from microui.core import Rect, Color, MU_COMMAND_RECT
+        from microui.context import begin, end
+        
+        begin(self.ctx)
+        
+        colors = (Color(255, 0, 0, 255), Color(255, 0, 0, 40),
+                  Color(250, 2, 3, 255))
+        self.assertEqual(colors[0].to_rgb565(), colors[2].to_rgb565())
+        for i, color in enumerate(colors):
+            draw_rect(self.ctx, Rect(10 + 20 * i, 10, 20, 5), color)
+        
+        end(self.ctx)
+        
+        types = [cmd.type for cmd in self.ctx.command_list]
+        self.assertEqual(types, [MU_COMMAND_RECT] * 3)
+        self.assertEqual([cmd.color for cmd in self.ctx.command_list],
+                         list(colors))
 
 
-class TestCanvas(unittest.TestCase):
+class TestCanvas(FramebufferTestCase):
     """Test canvas widget"""
     
     def setUp(self):
         from microui.core import Context
-        import framebuf
-        
-        # Create a framebuffer for testing
-        buffer = bytearray(240 * 320 * 2)
-        fb = framebuf.FrameBuffer(buffer, 240, 320, framebuf.RGB565)
         
-        self.ctx = Context(mock_text_width, mock_text_height, fb)
+        super().setUp()
+        self.ctx = Context(mock_text_width, mock_text_height, self.fb)
     
     def test_canvas_creation(self):
         """Test canvas widget creation"""
@@ -449,27 +713,28 @@ class TestCanvas(unittest.TestCase):
         from microui.controls import canvas, CanvasContext
         from microui.context import begin, end
         from microui.windows import begin_window, end_window
-        from microui.core import Rect, Color, MU_COMMAND_CANVAS_PIXEL
+        from microui.core import Rect, Color, MU_COMMAND_CANVAS_PIXELS
         
         begin(self.ctx)
         
         if begin_window(self.ctx, "Test", Rect(10, 10, 200, 200)):
             cv = canvas(self.ctx, 100, 100)
             cv.pixel(10, 20, (255, 0, 0, 255))
+            cv.pixel(11, 21, (0, 0, 255, 128))
             end_window(self.ctx)
         
         end(self.ctx)
         
-        # Check that pixel command was created
-        found = False
-        for cmd in self.ctx.command_list:
-            if cmd.type == MU_COMMAND_CANVAS_PIXEL:
-                self.assertEqual(cmd.x, 10)
-                self.assertEqual(cmd.y, 20)
-                self.assertEqual(cmd.color.r, 255)
-                found = True
-                break
-        self.assertTrue(found, "Pixel command not found")
+        # Check that both pixels went into one run
+        runs = [cmd for cmd in self.ctx.command_list
+                if cmd.type == MU_COMMAND_CANVAS_PIXELS]
+        self.assertEqual(len(runs), 1, "Pixel command not found")
+        cmd = runs[0]
+        self.assertEqual(list(cmd.xs), [10, 11])
+        self.assertEqual(list(cmd.ys), [20, 21])
+        self.assertEqual(cmd.rgb[0] >> 16, 255)
+        self.assertEqual(cmd.rgb[1] & 0xFF, 255)
+        self.assertEqual(list(cmd.alpha), [255, 128])
     
     def test_canvas_line(self):
         """Test canvas line drawing"""
@@ -584,6 +849,145 @@ class TestCanvas(unittest.TestCase):
         self.assertTrue(found, "Canvas text command not found")
 
 
+class TestDisplayManager(FramebufferTestCase):
+    """Test dirty area tracking in the display manager"""
+    
+    @classmethod
+    def setUpClass(cls):
+        import sys
+        import types
+        super().setUpClass()
+        # Off-device there is no machine module: a stand-in with the names
+        # microui.hardware imports is enough, as DisplayManager needs none
+        try:
+            import machine
+            cls._fake_machine = False
+        except ImportError:
+            machine = types.ModuleType('machine')
+            machine.Pin = machine.I2C = machine.SPI = object
+            sys.modules['machine'] = machine
+            cls._fake_machine = True
+        from microui import hardware
+        cls.hw = hardware
+    
+    @classmethod
+    def tearDownClass(cls):
+        import sys
+        if cls._fake_machine:
+            del sys.modules['machine']
+            sys.modules.pop('microui.hardware', None)
+    
+    def setUp(self):
+        from microui.core import Context
+        
+        super().setUp()
+        self.ctx = Context(mock_text_width, mock_text_height, self.fb)
+        
+        class Display:
+            width = 240
+            height = 320
+        
+        self.mgr = self.hw.DisplayManager(Display(), self.fb, bg_color=0x1234)
+        self.mgr.dirty = False
+    
+    def _frame(self, x):
+        """Build a frame with one window at x and mark it like run_frame_loop"""
+        from microui.windows import begin_window, end_window
+        from microui.core import Rect
+        from microui.context import begin, end, get_container
+        
+        begin(self.ctx)
+        if self.ctx.frame > 1:
+            # Move it the way dragging the title bar does
+            get_container(self.ctx, "W").rect.x = x
+        if begin_window(self.ctx, "W", Rect(x, 10, 50, 40)):
+            end_window(self.ctx)
+        end(self.ctx)
+        self.mgr.mark_roots_dirty(self.ctx)
+    
+    def test_moved_window_repainted(self):
+        """Test the area a window left is cleared and sent again"""
+        import asyncio
+        
+        self._frame(10)
+        asyncio.run(self.mgr._present(self.ctx, True))
+        
+        self.fb.fill(0)
+        self._frame(120)
+        region = list(self.mgr.dirty_rect)
+        self.assertLessEqual(region[0], 10)
+        self.assertGreaterEqual(region[2], 169)
+        
+        asyncio.run(self.mgr._present(self.ctx, True))
+        op = self.fb.operations[1]
+        self.assertEqual(op[0], 'fill_rect')
+        self.assertLessEqual(op[1], 10)
+        self.assertGreaterEqual(op[1] + op[3], 170)
+        self.assertEqual(op[5], 0x1234)
+        
+        # Once the old area has been repainted it is dropped
+        self._frame(120)
+        self.assertGreaterEqual(self.mgr.dirty_rect[0], 110)
+
+
+class TestWebServer(unittest.TestCase):
+    """Test web server frame patches (needs Flask)"""
+    
+    @classmethod
+    def setUpClass(cls):
+        try:
+            import web_server
+        except ImportError as e:
+            raise unittest.SkipTest(f"web server unavailable: {e}")
+        cls.ws = web_server
+    
+    def setUp(self):
+        self.ws._sent_frames.clear()
+        self.ws.init_context()
+    
+    def _frame(self, client, x=0, y=0):
+        """Run a frame for client and apply the response like index.html"""
+        from microui.context import begin, end, input_mousemove
+        ws = self.ws
+        ctx = ws.ctx
+        input_mousemove(ctx, x, y)
+        begin(ctx)
+        ws.update_ui(ctx)
+        end(ctx)
+        commands = ws.serialize_commands(ctx)
+        payload = ws.frame_payload(commands, ctx.frame, client.get('frame'))
+        if 'commands' in payload:
+            client['commands'] = list(payload['commands'])
+        else:
+            self.assertEqual(payload['base'], client['frame'])
+            cmds = client['commands']
+            for i, cmd in payload['patch']:
+                if i < len(cmds):
+                    cmds[i] = cmd
+                else:
+                    cmds.append(cmd)
+            del cmds[payload['len']:]
+        client['frame'] = ctx.frame
+        self.assertEqual(client['commands'], commands)
+        return payload
+    
+    def test_interleaved_clients(self):
+        """Test two clients patched against their own last frame"""
+        a = {}
+        b = {}
+        self.assertIn('commands', self._frame(a))
+        self.assertIn('commands', self._frame(b))
+        for step in range(4):
+            self.assertIn('patch', self._frame(a, 10 * step, 20))
+            self.assertIn('patch', self._frame(b, 50, 10 * step))
+        
+        # A client whose base was forgotten gets the full list again
+        stale = dict(a)
+        for _ in range(self.ws._SENT_FRAMES_MAX):
+            self._frame(b)
+        self.assertIn('commands', self._frame(stale))
+
+
 def add_test_case(suite, test_case_class):
     for attr in dir(test_case_class):
         if attr.startswith("test"):
@@ -601,6 +1005,8 @@ def run_tests():
     add_test_case(suite, TestWindows)
     add_test_case(suite, TestDrawing)
     add_test_case(suite, TestCanvas)
+    add_test_case(suite, TestDisplayManager)
+    add_test_case(suite, TestWebServer)
 
     runner = unittest.TextTestRunner(verbosity=2)
     result = runner.run(suite)
@@ -3,22 +3,31 @@
 Flask web server for microui rendering
 Receives mouse events from web client and returns drawing commands
 """
+import functools
+import json
 import logging
-from flask import Flask, render_template, jsonify, request
-from flask_cors import CORS
+from flask import Flask, render_template, request, Response
 import sys
 import os
+import threading
+
+try:
+    import orjson
+    _dumps = orjson.dumps
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj, separators=(',', ':'))
 
 # Add current directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from microui import *
 from microui.core import (
-    MU_COMMAND_JUMP, MU_COMMAND_CLIP, MU_COMMAND_RECT, 
+    MU_COMMAND_CLIP, MU_COMMAND_RECT, 
     MU_COMMAND_TEXT, MU_COMMAND_ICON,
     MU_COMMAND_CANVAS_PIXEL, MU_COMMAND_CANVAS_LINE, 
     MU_COMMAND_CANVAS_RECT, MU_COMMAND_CANVAS_CIRCLE, 
-    MU_COMMAND_CANVAS_TEXT
+    MU_COMMAND_CANVAS_TEXT, MU_COMMAND_BOX, MU_COMMAND_CANVAS_PIXELS
 )
 
 
@@ -31,7 +40,21 @@ logger = logging.getLogger(__name__)
 
 # Flask app
 app = Flask(__name__)
-CORS(app)
+
+# The page and the API share an origin, so no CORS by default. For a client
+# served elsewhere set MICROUI_CORS_ORIGIN to its origin.
+_CORS_ORIGIN = os.environ.get('MICROUI_CORS_ORIGIN')
+
+if _CORS_ORIGIN:
+    @app.after_request
+    def _allow_cross_origin(response):
+        """Add CORS headers to API responses (preflights included)"""
+        if request.path.startswith('/api/'):
+            headers = response.headers
+            headers['Access-Control-Allow-Origin'] = _CORS_ORIGIN
+            headers['Access-Control-Allow-Headers'] = 'Content-Type'
+            headers['Access-Control-Max-Age'] = '600'  # cache preflights
+        return response
 
 # UI state
 _ui_state = {
@@ -41,17 +64,21 @@ _ui_state = {
     'counter': 0,
 }
 
-# MicroUI context
+# MicroUI context, shared by all request threads: hold _ctx_lock while
+# feeding input, building a frame and diffing its commands
 ctx = None
+_ctx_lock = threading.Lock()
 WIDTH = 400
 HEIGHT = 600
 
 
+@functools.lru_cache(maxsize=1024)
 def text_width(font, text):
     """Calculate text width (8px per char)"""
     return len(text) * 8
 
 
+@functools.lru_cache(maxsize=16)
 def text_height(font):
     """Get text height"""
     return 10
@@ -122,235 +149,261 @@ def _update_ui(ctx):
 from demo_4_ui import update_ui
 from demo_4_ui import ui_state
 
+# Each command goes out as one flat array:
+# [type, geometry..., r, g, b, a] with the text last for text commands
+
+def _ser_clip(cmd):
+    r = cmd.rect
+    return (MU_COMMAND_CLIP, r.x, r.y, r.w, r.h)
+
+
+def _ser_rect(cmd):
+    c = cmd.color
+    return (MU_COMMAND_RECT, cmd.x, cmd.y, cmd.w, cmd.h, c.r, c.g, c.b, c.a)
+
+
+def _ser_text(cmd):
+    c = cmd.color
+    return (MU_COMMAND_TEXT, cmd.pos.x, cmd.pos.y, c.r, c.g, c.b, c.a, cmd.text)
+
+
+def _ser_icon(cmd):
+    r = cmd.rect
+    c = cmd.color
+    return (MU_COMMAND_ICON, cmd.id, r.x, r.y, r.w, r.h, c.r, c.g, c.b, c.a)
+
+
+def _ser_canvas_pixel(cmd):
+    cr = cmd.canvas_rect
+    c = cmd.color
+    return (MU_COMMAND_CANVAS_PIXEL, cr.x, cr.y, cr.w, cr.h,
+            cmd.x, cmd.y, c.r, c.g, c.b, c.a)
+
+
+def _ser_canvas_line(cmd):
+    cr = cmd.canvas_rect
+    c = cmd.color
+    return (MU_COMMAND_CANVAS_LINE, cr.x, cr.y, cr.w, cr.h,
+            cmd.x1, cmd.y1, cmd.x2, cmd.y2, c.r, c.g, c.b, c.a)
+
+
+def _ser_canvas_rect(cmd):
+    cr = cmd.canvas_rect
+    c = cmd.color
+    return (MU_COMMAND_CANVAS_RECT, cr.x, cr.y, cr.w, cr.h,
+            cmd.x, cmd.y, cmd.w, cmd.h, 1 if cmd.filled else 0,
+            c.r, c.g, c.b, c.a)
+
+
+def _ser_canvas_circle(cmd):
+    cr = cmd.canvas_rect
+    c = cmd.color
+    return (MU_COMMAND_CANVAS_CIRCLE, cr.x, cr.y, cr.w, cr.h,
+            cmd.x, cmd.y, cmd.radius, 1 if cmd.filled else 0,
+            c.r, c.g, c.b, c.a)
+
+
+def _ser_canvas_text(cmd):
+    cr = cmd.canvas_rect
+    c = cmd.color
+    return (MU_COMMAND_CANVAS_TEXT, cr.x, cr.y, cr.w, cr.h,
+            cmd.x, cmd.y, c.r, c.g, c.b, c.a, cmd.text)
+
+
+_SER = {
+    MU_COMMAND_CLIP: _ser_clip,
+    MU_COMMAND_RECT: _ser_rect,
+    MU_COMMAND_TEXT: _ser_text,
+    MU_COMMAND_ICON: _ser_icon,
+    MU_COMMAND_CANVAS_PIXEL: _ser_canvas_pixel,
+    MU_COMMAND_CANVAS_LINE: _ser_canvas_line,
+    MU_COMMAND_CANVAS_RECT: _ser_canvas_rect,
+    MU_COMMAND_CANVAS_CIRCLE: _ser_canvas_circle,
+    MU_COMMAND_CANVAS_TEXT: _ser_canvas_text,
+}
+
+
+def _serialize_box(cmd, out):
+    """Append a box command as its four edge rect commands"""
+    c = cmd.color
+    r, g, b, a = c.r, c.g, c.b, c.a
+    x, y, w, h = cmd.x, cmd.y, cmd.w, cmd.h
+    out.append((MU_COMMAND_RECT, x + 1, y, w - 2, 1, r, g, b, a))
+    out.append((MU_COMMAND_RECT, x + 1, y + h - 1, w - 2, 1, r, g, b, a))
+    out.append((MU_COMMAND_RECT, x, y, 1, h, r, g, b, a))
+    out.append((MU_COMMAND_RECT, x + w - 1, y, 1, h, r, g, b, a))
+
+
+def _serialize_pixels(cmd, out):
+    """Append a pixel run as one canvas pixel command per pixel"""
+    cr = cmd.canvas_rect
+    cx, cy, cw, ch = cr.x, cr.y, cr.w, cr.h
+    rgb = cmd.rgb
+    alpha = cmd.alpha
+    ys = cmd.ys
+    append = out.append
+    for i, x in enumerate(cmd.xs):
+        c = rgb[i]
+        append((MU_COMMAND_CANVAS_PIXEL, cx, cy, cw, ch, x, ys[i],
+                c >> 16, (c >> 8) & 0xFF, c & 0xFF, alpha[i]))
+
+
 def serialize_commands(ctx):
-    """Convert command list to JSON-serializable format"""
+    """Convert command list to flat JSON-serializable tuples"""
     commands = []
+    append = commands.append
+    ser = _SER.get
+    BOX = MU_COMMAND_BOX
+    PIXELS = MU_COMMAND_CANVAS_PIXELS
     
     for cmd in ctx.command_list:
-        cmd_data = {
-            'type': cmd.type,
-        }
-        
-        if cmd.type == MU_COMMAND_CLIP:
-            cmd_data['rect'] = {
-                'x': cmd.rect.x,
-                'y': cmd.rect.y,
-                'w': cmd.rect.w,
-                'h': cmd.rect.h
-            }
-        elif cmd.type == MU_COMMAND_RECT:
-            cmd_data['rect'] = {
-                'x': cmd.rect.x,
-                'y': cmd.rect.y,
-                'w': cmd.rect.w,
-                'h': cmd.rect.h
-            }
-            cmd_data['color'] = {
-                'r': cmd.color.r,
-                'g': cmd.color.g,
-                'b': cmd.color.b,
-                'a': cmd.color.a
-            }
-        elif cmd.type == MU_COMMAND_TEXT:
-            cmd_data['pos'] = {
-                'x': cmd.pos.x,
-                'y': cmd.pos.y
-            }
-            cmd_data['text'] = cmd.text
-            cmd_data['color'] = {
-                'r': cmd.color.r,
-                'g': cmd.color.g,
-                'b': cmd.color.b,
-                'a': cmd.color.a
-            }
-        elif cmd.type == MU_COMMAND_ICON:
-            cmd_data['icon_id'] = cmd.id
-            cmd_data['rect'] = {
-                'x': cmd.rect.x,
-                'y': cmd.rect.y,
-                'w': cmd.rect.w,
-                'h': cmd.rect.h
-            }
-            cmd_data['color'] = {
-                'r': cmd.color.r,
-                'g': cmd.color.g,
-                'b': cmd.color.b,
-                'a': cmd.color.a
-            }
-        elif cmd.type == MU_COMMAND_CANVAS_PIXEL:
-            cmd_data['canvas_rect'] = {
-                'x': cmd.canvas_rect.x,
-                'y': cmd.canvas_rect.y,
-                'w': cmd.canvas_rect.w,
-                'h': cmd.canvas_rect.h
-            }
-            cmd_data['x'] = cmd.x
-            cmd_data['y'] = cmd.y
-            cmd_data['color'] = {
-                'r': cmd.color.r,
-                'g': cmd.color.g,
-                'b': cmd.color.b,
-                'a': cmd.color.a
-            }
-        elif cmd.type == MU_COMMAND_CANVAS_LINE:
-            cmd_data['canvas_rect'] = {
-                'x': cmd.canvas_rect.x,
-                'y': cmd.canvas_rect.y,
-                'w': cmd.canvas_rect.w,
-                'h': cmd.canvas_rect.h
-            }
-            cmd_data['x1'] = cmd.x1
-            cmd_data['y1'] = cmd.y1
-            cmd_data['x2'] = cmd.x2
-            cmd_data['y2'] = cmd.y2
-            cmd_data['color'] = {
-                'r': cmd.color.r,
-                'g': cmd.color.g,
-                'b': cmd.color.b,
-                'a': cmd.color.a
-            }
-        elif cmd.type == MU_COMMAND_CANVAS_RECT:
-            cmd_data['canvas_rect'] = {
-                'x': cmd.canvas_rect.x,
-                'y': cmd.canvas_rect.y,
-                'w': cmd.canvas_rect.w,
-                'h': cmd.canvas_rect.h
-            }
-            cmd_data['x'] = cmd.x
-            cmd_data['y'] = cmd.y
-            cmd_data['w'] = cmd.w
-            cmd_data['h'] = cmd.h
-            cmd_data['filled'] = cmd.filled
-            cmd_data['color'] = {
-                'r': cmd.color.r,
-                'g': cmd.color.g,
-                'b': cmd.color.b,
-                'a': cmd.color.a
-            }
-        elif cmd.type == MU_COMMAND_CANVAS_CIRCLE:
-            cmd_data['canvas_rect'] = {
-                'x': cmd.canvas_rect.x,
-                'y': cmd.canvas_rect.y,
-                'w': cmd.canvas_rect.w,
-                'h': cmd.canvas_rect.h
-            }
-            cmd_data['x'] = cmd.x
-            cmd_data['y'] = cmd.y
-            cmd_data['radius'] = cmd.radius
-            cmd_data['filled'] = cmd.filled
-            cmd_data['color'] = {
-                'r': cmd.color.r,
-                'g': cmd.color.g,
-                'b': cmd.color.b,
-                'a': cmd.color.a
-            }
-        elif cmd.type == MU_COMMAND_CANVAS_TEXT:
-            cmd_data['canvas_rect'] = {
-                'x': cmd.canvas_rect.x,
-                'y': cmd.canvas_rect.y,
-                'w': cmd.canvas_rect.w,
-                'h': cmd.canvas_rect.h
-            }
-            cmd_data['x'] = cmd.x
-            cmd_data['y'] = cmd.y
-            cmd_data['text'] = cmd.text
-            cmd_data['color'] = {
-                'r': cmd.color.r,
-                'g': cmd.color.g,
-                'b': cmd.color.b,
-                'a': cmd.color.a
-            }
-        
-        commands.append(cmd_data)
+        t = cmd.type
+        fn = ser(t)
+        if fn is not None:
+            append(fn(cmd))
+        elif t == BOX:
+            # The client only knows filled rects: send the four edges
+            _serialize_box(cmd, commands)
+        elif t == PIXELS:
+            _serialize_pixels(cmd, commands)
+        # JUMP and merged-away (NONE) commands draw nothing on the client
     
     return commands
 
 
+# Command lists of the last few frames sent, by frame number. Each client
+# says which frame it last applied and is patched against that one, so
+# clients (tabs, reloads, lost responses) never share a baseline.
+_SENT_FRAMES_MAX = 8
+_sent_frames = {}
+
+
+def diff_commands(prev, commands):
+    """
+    Patch from command list prev to commands
+    
+    Returns [[index, command], ...] for the commands that changed; the
+    client truncates its copy to len(commands) after applying it.
+    """
+    n = len(prev)
+    return [[i, cmd] for i, cmd in enumerate(commands)
+            if i >= n or cmd != prev[i]]
+
+
+def frame_payload(commands, frame, base=None):
+    """
+    Remember commands as frame and build the response body for a client
+    whose last applied frame is base
+    
+    Returns {'base', 'patch', 'len'} if base is still remembered, or the
+    full {'commands'} list otherwise (first request, or a client that
+    fell too far behind).
+    """
+    prev = _sent_frames.get(base) if base is not None else None
+    _sent_frames[frame] = commands
+    while len(_sent_frames) > _SENT_FRAMES_MAX:
+        del _sent_frames[next(iter(_sent_frames))]
+    
+    if prev is None:
+        return {'commands': commands}
+    return {'base': base, 'patch': diff_commands(prev, commands),
+            'len': len(commands)}
+
+
+def _json_response(payload, status=200):
+    """Encode payload with orjson when available, bypassing jsonify"""
+    return Response(_dumps(payload), status=status, mimetype='application/json')
+
+
 @app.route('/')
 def index():
     """Serve main page"""
     return render_template('index.html', width=WIDTH, height=HEIGHT)
 
 
+def _apply_event(ctx, event):
+    """Feed one mouse event into the context"""
+    event_type = event.get('type')
+    x = event.get('x', 0)
+    y = event.get('y', 0)
+    button = event.get('button', 0)
+    
+    logger.debug(f"Event: {event_type} at ({x}, {y}) button={button}")
+    
+    input_mousemove(ctx, x, y)
+    if event_type == 'mousedown' or event_type == 'mouseup':
+        # Run a frame at the new position first so hover is up to date
+        # when the button changes
+        begin(ctx)
+        update_ui(ctx)
+        end(ctx)
+        
+        if button == 0:  # Left button
+            if event_type == 'mousedown':
+                input_mousedown(ctx, x, y, MU_MOUSE_LEFT)
+            else:
+                input_mouseup(ctx, x, y, MU_MOUSE_LEFT)
+
+
 @app.route('/api/render', methods=['POST'])
 def render():
-    """Process mouse event and return drawing commands"""
+    """Process a batch of mouse events and return drawing commands"""
     try:
         data = request.json
-        event_type = data.get('type')
-        x = data.get('x', 0)
-        y = data.get('y', 0)
-        button = data.get('button', 0)
         
-        logger.debug(f"Event: {event_type} at ({x}, {y}) button={button}")
-        
-        # Update mouse state
-        if event_type == 'mousemove':
-            input_mousemove(ctx, x, y)
-        elif event_type == 'mousedown':
-            input_mousemove(ctx, x, y)
-            begin(ctx)
-            update_ui(ctx)
-            end(ctx)
-
-            if button == 0:  # Left button
-                input_mousedown(ctx, x, y, MU_MOUSE_LEFT)
-        elif event_type == 'mouseup':
-            input_mousemove(ctx, x, y)
+        with _ctx_lock:
+            # Moves only update the mouse position; the UI is rebuilt once
+            # for the whole batch (a single event without 'events' works)
+            for event in data.get('events', (data,)):
+                _apply_event(ctx, event)
+            
+            # Process frame
             begin(ctx)
             update_ui(ctx)
             end(ctx)
             
-            if button == 0:  # Left button
-                input_mouseup(ctx, x, y, MU_MOUSE_LEFT)
-        
-        # Process frame
-        begin(ctx)
-        update_ui(ctx)
-        end(ctx)
-        
-        # Serialize commands
-        commands = serialize_commands(ctx)
+            # Serialize commands, sending only what changed since the
+            # frame this client last applied
+            payload = frame_payload(serialize_commands(ctx), ctx.frame,
+                                    data.get('frame'))
+            payload['status'] = 'ok'
+            payload['frame'] = ctx.frame
         
-        return jsonify({
-            'status': 'ok',
-            'commands': commands,
-            'frame': ctx.frame
-        })
+        return _json_response(payload)
         
     except Exception as e:
         logger.error(f"Error processing render: {e}", exc_info=True)
-        return jsonify({
+        return _json_response({
             'status': 'error',
             'message': str(e)
-        }), 500
+        }, 500)
 
 
 @app.route('/api/init', methods=['GET'])
 def init():
     """Initialize and return first frame"""
     try:
-        # Process initial frame
-        begin(ctx)
-        update_ui(ctx)
-        end(ctx)
-        
-        commands = serialize_commands(ctx)
+        with _ctx_lock:
+            # Process initial frame
+            begin(ctx)
+            update_ui(ctx)
+            end(ctx)
+            
+            # Full frame; this client's renders are patched against it
+            payload = frame_payload(serialize_commands(ctx), ctx.frame)
+            payload['status'] = 'ok'
+            payload['frame'] = ctx.frame
+            payload['width'] = WIDTH
+            payload['height'] = HEIGHT
         
-        return jsonify({
-            'status': 'ok',
-            'commands': commands,
-            'frame': ctx.frame,
-            'width': WIDTH,
-            'height': HEIGHT
-        })
+        return _json_response(payload)
         
     except Exception as e:
         logger.error(f"Error in init: {e}", exc_info=True)
-        return jsonify({
+        return _json_response({
             'status': 'error',
             'message': str(e)
-        }), 500
+        }, 500)
 
 
 def main():
@@ -358,8 +411,13 @@ def main():
     logger.info("Starting MicroUI Web Server")
     init_context()
     
-    # Run Flask app
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    if os.environ.get('MICROUI_DEBUG'):
+        # Werkzeug dev server with reloader and debugger
+        app.run(host='0.0.0.0', port=5000, debug=True)
+        return
+    
+    from waitress import serve
+    serve(app, host='0.0.0.0', port=5000, threads=4)
 
 
 if __name__ == '__main__':